@@ -3,13 +3,17 @@
 import streamlit as st
 import pandas as pd
 import os
-import time
-import csv
 from datetime import datetime
 from dotenv import load_dotenv
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from keyword_classifier import get_matcher
+from language_detection import detect_languages, language_mix
+from supplier_mentions import flag_supplier_mismatches
+from supplier_resolution import SupplierRegistry
+from ticket_ids import new_ticket_id
+from ticket_store import TicketBatch, open_ticket_store, ticket_key
 
 # ---------- Load config ----------
 load_dotenv()
@@ -23,26 +27,30 @@ st.set_page_config(page_title="Meesho Supplier Quality AI + Tickets", layout="wi
 st.title("🧠 Meesho Supplier Quality AI Agent — Auto Tickets & Alerts")
 st.markdown("Upload complaints; supplier-related complaints will auto-create tickets and send alerts.")
 
-# Ticket file
-TICKETS_FILE = "tickets.csv"
-if not os.path.exists(TICKETS_FILE):
-    with open(TICKETS_FILE, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["Ticket_ID", "Complaint_ID", "Supplier", "Product", "Order_ID", "Issue", "Created_At", "Status", "Notes"])
+# Ticket store (SQLite by default, tickets.csv with TICKET_STORE=csv)
+@st.cache_resource
+def get_ticket_store():
+    # Opened once per server process; the first open imports an existing tickets.csv
+    return open_ticket_store()
 
 # ---------- Dummy Classification ----------
-def call_openai_classify(text):
-    text = text.lower()
-    if any(word in text for word in ["damage", "wrong", "missing", "color", "defect"]):
-        return "Supplier Issue"
-    elif any(word in text for word in ["late", "courier", "delivery"]):
-        return "Logistics Issue"
-    else:
-        return "Customer Issue"
+# Rules come from classifier_rules.json; get_matcher recompiles them only when the file changes
+def classify_messages(messages):
+    return get_matcher().classify_series(messages)
+
+def analyze_messages(messages):
+    # AI_Category, Confidence, AI_Labels, Severity and Fuzzy from a single pass
+    return get_matcher().analyze_series(messages)
+
+@st.cache_resource
+def get_supplier_registry():
+    return SupplierRegistry()
 
 # ---------- Ticket Creation ----------
-def create_ticket_entry(complaint_row, issue_text):
-    ticket_id = f"T{int(time.time()*1000)}"
+def create_ticket_entry(complaint_row, issue_text, batch=None, kind=None):
+    # With a kind ("complaint" / "aggregate") a complaint gets at most one ticket of that kind;
+    # repeats return None
+    ticket_id = new_ticket_id()
     created_at = datetime.now().isoformat(sep=' ', timespec='seconds')
     ticket = {
         "Ticket_ID": ticket_id,
@@ -55,10 +63,7 @@ def create_ticket_entry(complaint_row, issue_text):
         "Status": "Open",
         "Notes": ""
     }
-    with open(TICKETS_FILE, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(ticket.values())
-    return ticket
+    return (batch or get_ticket_store()).add(ticket, ticket_key(ticket["Complaint_ID"], kind) if kind else None)
 
 # ---------- Email Alert with Debug ----------
 def send_email_alert(ticket, recipient):
@@ -119,35 +124,65 @@ if uploaded_file:
 
     if st.button("Run AI classification & create tickets"):
         with st.spinner("Classifying complaints..."):
-            df["AI_Category"] = df["Message"].apply(call_openai_classify)
+            analysis = analyze_messages(df["Message"])
+            df[["AI_Category", "AI_Labels", "Severity"]] = analysis[["AI_Category", "AI_Labels", "Severity"]]
+            # Categories found only by correcting a typo are not settled: no label, no ticket
+            df.loc[analysis["Fuzzy"], "AI_Category"] = "Unknown"
+            df["Language"] = detect_languages(df["Message"])
         st.success("Classification complete")
-        st.dataframe(df[["Complaint_ID", "Message", "Supplier", "AI_Category"]])
-
-        supplier_counts = df.groupby("Supplier")["Complaint_ID"].count().reset_index(name="count")
+        if analysis["Fuzzy"].any():
+            st.warning(
+                f"{int(analysis['Fuzzy'].sum())} complaint(s) matched keywords only after typo correction; "
+                "left as Unknown for review"
+            )
+        st.subheader("Language Mix")
+        st.table(language_mix(df["Language"]))
+        st.dataframe(df[["Complaint_ID", "Message", "Supplier", "Language", "AI_Category", "AI_Labels", "Severity"]])
+
+        df["Mentioned_Supplier"], df["Supplier_Mismatch"] = flag_supplier_mismatches(df)
+        if df["Supplier_Mismatch"].any():
+            st.warning(f"{int(df['Supplier_Mismatch'].sum())} complaint(s) mention a different supplier than their Supplier column")
+            st.dataframe(df.loc[df["Supplier_Mismatch"], ["Complaint_ID", "Message", "Supplier", "Mentioned_Supplier"]])
+
+        # Group spelling variants of a supplier ("XYZ Traders ", "xyz traders pvt ltd") together
+        df["Supplier_ID"], df["Canonical_Supplier"] = get_supplier_registry().resolve(df["Supplier"])
+        supplier_counts = (
+            df.groupby("Canonical_Supplier")["Complaint_ID"].count().reset_index(name="count")
+            .rename(columns={"Canonical_Supplier": "Supplier"})
+        )
 
         st.subheader("Supplier Issue Counts (All Complaints)")
         st.dataframe(supplier_counts)
 
-        new_tickets = []
-        for _, row in df.iterrows():
-            if row["AI_Category"] == "Supplier Issue":
-                ticket = create_ticket_entry(row, "Supplier Issue detected from complaint text")
-                new_tickets.append(ticket)
-                if email_alerts:
-                    send_email_alert(ticket, email_recipient)
+        # Tickets are saved in one write per run; alerts go out after they are saved
+        batch = TicketBatch(get_ticket_store())
+        queued = []
+        supplier_issues = df[df["AI_Category"] == "Supplier Issue"].sort_values("Severity", ascending=False, kind="stable")
+        for _, row in supplier_issues.iterrows():
+            queued.append(create_ticket_entry(
+                row, f"Supplier Issue detected from complaint text (severity {row['Severity']}: {row['AI_Labels']})",
+                batch, kind="complaint"
+            ))
 
         for _, row in supplier_counts.iterrows():
             supplier, cnt = row["Supplier"], row["count"]
             if cnt >= auto_ticket_threshold:
-                sample_row = df[df["Supplier"] == supplier].iloc[0].to_dict()
-                ticket = create_ticket_entry(sample_row, f"Aggregate alert: {cnt} total complaints for {supplier}")
-                new_tickets.append(ticket)
-                if email_alerts:
-                    send_email_alert(ticket, email_recipient)
+                sample_row = df[df["Canonical_Supplier"] == supplier].iloc[0].to_dict()
+                sample_row["Supplier"] = supplier
+                queued.append(create_ticket_entry(
+                    sample_row, f"Aggregate alert: {cnt} total complaints for {supplier}", batch, kind="aggregate"
+                ))
+        new_tickets = batch.flush()
+        if len(new_tickets) < len(queued):
+            st.write(f"Debug: skipped {len(queued) - len(new_tickets)} duplicate ticket(s) already created for these complaints")
+
+        if email_alerts:
+            for ticket in new_tickets:
+                send_email_alert(ticket, email_recipient)
 
         st.subheader("New Tickets Created")
         if new_tickets:
-            st.write(f"{len(new_tickets)} ticket(s) created and logged to {TICKETS_FILE}.")
+            st.write(f"{len(new_tickets)} ticket(s) created and logged to {get_ticket_store().location}.")
             st.dataframe(pd.DataFrame(new_tickets))
         else:
             st.write("No supplier-related tickets detected.")
@@ -155,7 +190,6 @@ if uploaded_file:
 st.markdown("---")
 st.subheader("All Tickets Log")
 try:
-    tickets_df = pd.read_csv(TICKETS_FILE)
-    st.dataframe(tickets_df.sort_values("Created_At", ascending=False).head(200))
+    st.dataframe(get_ticket_store().latest(200))
 except Exception as e:
     st.write("No tickets yet or error reading tickets file:", e)
@@ -0,0 +1,219 @@
+# benchmark_classifiers.py
+import argparse
+import os
+import random
+import time
+import numpy as np
+import openai
+import pandas as pd
+from embedding_classifier import EMBEDDING_INDEX_FILE, ExemplarClassifier
+from fake_openai_server import start_fake_server
+from keyword_classifier import get_matcher
+from llm_classifier import PROMPT_MODE, PROMPT_MODES, TokenUsage, classify_batch, classify_text, estimate_tokens
+from llm_engine import RateLimiter, run_batches
+from local_classifier import LOCAL_MODEL_FILE, LocalClassifier
+
+# Measures rows/sec and per-call latency of every classification path on synthetic
+# complaints. OpenAI paths run against fake_openai_server, never the real API.
+
+TEMPLATES = [
+    "Received damaged {product} from {supplier}",
+    "Wrong size sent by {supplier} for order {order}",
+    "Late delivery by courier for order {order}",
+    "Color mismatch from {supplier}",
+    "Missing product from {supplier}, order {order}",
+    "Excellent quality, thank you",
+    "Defect in the {product} stitching",
+    "Courier did not call before delivery",
+    "Want to change my delivery address",
+    "Refund for order {order} not received yet",
+    "{product} quality is very good, happy with {supplier}",
+    "Package arrived {days} days late",
+]
+SUPPLIERS = ["XYZ Traders", "ABC Textiles", "GHI Suppliers", "DEF Fashions", "JKL Handlooms"]
+PRODUCTS = ["saree", "shirt", "dress", "bag", "shoes", "kurti"]
+
+
+def synthetic_complaints(rows, seed=0):
+    """
+    Complaints DataFrame in the complaints.csv schema, built from templates.
+    """
+    rng = random.Random(seed)
+    records = []
+    for i in range(rows):
+        supplier = rng.choice(SUPPLIERS)
+        message = rng.choice(TEMPLATES).format(
+            product=rng.choice(PRODUCTS), supplier=supplier, order=f"O{100000 + i}", days=rng.randint(2, 9)
+        )
+        records.append((i + 1, message, supplier, rng.choice(PRODUCTS).title(), f"O{100000 + i}"))
+    return pd.DataFrame(records, columns=["Complaint_ID", "Message", "Supplier", "Product", "Order_ID"])
+
+
+def timed_calls(items, func):
+    """
+    Run func over items serially, returning (results, per-call latencies).
+    """
+    results, latencies = [], []
+    for item in items:
+        start = time.perf_counter()
+        results.append(func(item))
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+
+def chunked(values, size):
+    return [values[start:start + size] for start in range(0, len(values), size)]
+
+
+def _count_errors(func):
+    errors = []
+
+    def call(item):
+        try:
+            return func(item)
+        except Exception as e:
+            errors.append(e)
+            return None
+    return call, errors
+
+
+# ---------- Classifier paths ----------
+def bench_keyword_scalar(messages, args):
+    _, latencies = timed_calls(messages.tolist(), get_matcher().classify)
+    return latencies, "row", 0
+
+
+def bench_keyword_vectorized(messages, args):
+    _, latencies = timed_calls(chunked(messages, args.chunk_rows), get_matcher().classify_series)
+    return latencies, f"{args.chunk_rows}-row chunk", 0
+
+
+def bench_local_model(messages, args):
+    model = args.local_model
+    _, latencies = timed_calls(chunked(messages, args.chunk_rows), model.predict_series)
+    return latencies, f"{args.chunk_rows}-row chunk", 0
+
+
+def bench_exemplars(messages, args):
+    _, latencies = timed_calls(chunked(messages, args.chunk_rows), args.exemplars.predict_series)
+    return latencies, f"{args.chunk_rows}-row chunk", 0
+
+
+def bench_openai_single(messages, args):
+    call, errors = _count_errors(lambda text: classify_text(text, mode=args.prompt_mode, usage=args.usage))
+    _, latencies = timed_calls(messages.tolist(), call)
+    return latencies, "request", len(errors)
+
+
+def bench_openai_batched(messages, args):
+    call, errors = _count_errors(lambda chunk: classify_batch(chunk, mode=args.prompt_mode, usage=args.usage))
+    _, latencies = timed_calls(chunked(messages.tolist(), args.batch_size), call)
+    return latencies, f"{args.batch_size}-complaint request", len(errors)
+
+
+def bench_openai_concurrent(messages, args):
+    latencies = []
+
+    def call(chunk):
+        start = time.perf_counter()
+        try:
+            return classify_batch(chunk, mode=args.prompt_mode, usage=args.usage)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    limiter = RateLimiter(args.requests_per_minute, args.tokens_per_minute)
+    # Malformed batch answers are resent in halves, each as its own rate-limited request
+    _, errors = run_batches(
+        chunked(messages.tolist(), args.batch_size), call, args.workers, limiter,
+        lambda chunk: estimate_tokens(chunk, args.prompt_mode)
+    )
+    return latencies, f"{args.batch_size}-complaint request", len(errors)
+
+
+PATHS = [
+    ("keyword (per row)", bench_keyword_scalar, False),
+    ("keyword (vectorized)", bench_keyword_vectorized, False),
+    ("local model", bench_local_model, False),
+    ("nearest exemplars", bench_exemplars, False),
+    ("openai (single)", bench_openai_single, True),
+    ("openai (batched)", bench_openai_batched, True),
+    ("openai (batched + concurrent)", bench_openai_concurrent, True),
+]
+
+
+# ---------- Runner ----------
+def run_benchmarks(args):
+    """
+    One result row per (size, path). LLM paths are capped at --llm-max-rows:
+    a capped path runs once at the cap and is skipped for larger sizes rather
+    than re-measuring the same rows under a bigger size.
+    """
+    results = []
+    measured = set()
+    for rows in args.sizes:
+        df = synthetic_complaints(rows)
+        for name, bench, uses_llm in PATHS:
+            if args.paths and not any(p in name for p in args.paths):
+                continue
+            if (name == "local model" and args.local_model is None) or (name == "nearest exemplars" and args.exemplars is None):
+                continue
+            bench_rows = min(rows, args.llm_max_rows) if uses_llm else rows
+            if (name, bench_rows) in measured:
+                print(f"{name:<32} {rows:>9} rows  skipped: capped at {bench_rows} rows, already measured")
+                continue
+            measured.add((name, bench_rows))
+            messages = df["Message"].iloc[:bench_rows]
+            args.usage = TokenUsage()
+            start = time.perf_counter()
+            latencies, unit, errors = bench(messages, args)
+            elapsed = time.perf_counter() - start
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000 if latencies else (0.0, 0.0, 0.0)
+            results.append({
+                "path": name, "size": rows, "rows": bench_rows, "capped": bench_rows < rows,
+                "seconds": round(elapsed, 3),
+                "rows_per_sec": round(bench_rows / elapsed if elapsed else 0.0, 1),
+                "latency_unit": unit, "p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "p99_ms": round(p99, 3),
+                "errors": errors, "prompt_tokens": args.usage.prompt_tokens,
+                "completion_tokens": args.usage.completion_tokens,
+            })
+            tokens = f"  tokens {args.usage.prompt_tokens}+{args.usage.completion_tokens}" if uses_llm else ""
+            capped = f"  (capped from {rows})" if bench_rows < rows else ""
+            print(f"{name:<32} {bench_rows:>9} rows  {results[-1]['rows_per_sec']:>12,.0f} rows/s  "
+                  f"p50 {p50:9.3f} ms  p95 {p95:9.3f} ms  p99 {p99:9.3f} ms  per {unit}  errors {errors}{tokens}{capped}")
+    return pd.DataFrame(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark complaint classification throughput and latency.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--paths", nargs="*", help="Only run paths whose name contains one of these strings")
+    parser.add_argument("--llm-max-rows", type=int, default=1000, help="Row cap for paths that call the (fake) API")
+    parser.add_argument("--chunk-rows", type=int, default=10000, help="Rows per call for vectorized paths")
+    parser.add_argument("--batch-size", type=int, default=20, help="Complaints per batched request")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--prompt-mode", choices=PROMPT_MODES, default=PROMPT_MODE)
+    parser.add_argument("--requests-per-minute", type=int, default=0, help="0 disables the limit")
+    parser.add_argument("--tokens-per-minute", type=int, default=0, help="0 disables the limit")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake API mean latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake API HTTP 500 fraction")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fake API HTTP 429 fraction")
+    parser.add_argument("--model", default=LOCAL_MODEL_FILE, help="Local model file; skipped when missing")
+    parser.add_argument("--index", default=EMBEDDING_INDEX_FILE, help="Exemplar index file; skipped when missing")
+    parser.add_argument("--output", help="Write results to this CSV")
+    args = parser.parse_args()
+
+    args.local_model = LocalClassifier.load(args.model) if os.path.exists(args.model) else None
+    args.exemplars = ExemplarClassifier.load(args.index) if os.path.exists(args.index) else None
+    server, api_base = start_fake_server(args.latency, args.error_rate, args.rate_limit_rate)
+    openai.api_base = api_base
+    openai.api_key = "sk-fake-benchmark"
+    try:
+        results = run_benchmarks(args)
+    finally:
+        server.shutdown()
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
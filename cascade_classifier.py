@@ -0,0 +1,64 @@
+# cascade_classifier.py
+import os
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from keyword_classifier import LABEL_SEPARATOR, get_matcher
+
+# ---------- Config ----------
+load_dotenv()
+# Rows whose keyword confidence is below this go on to the LLM tier
+CASCADE_MIN_CONFIDENCE = float(os.getenv("CASCADE_MIN_CONFIDENCE") or 1.0)
+
+
+# ---------- Cascade ----------
+def classify_cascade(messages, llm_classify, matcher=None, min_confidence=CASCADE_MIN_CONFIDENCE):
+    """
+    Classify messages with the keyword rules first and send only the rows
+    below `min_confidence` to `llm_classify`, which takes and returns a Series.
+    Rows whose categories were only found through a corrected typo always go
+    on, since the rules have not settled them.
+    Rows the LLM left without a category (a failed request) keep their keyword
+    result and are tagged "keyword-fallback" instead of "llm".
+    Returns (result, stats): result is a DataFrame aligned with messages holding
+    AI_Category, AI_Source (the tier per row), AI_Labels (every category found)
+    and Severity; stats holds the row count and share handled by each tier.
+    `matcher` defaults to the current rule file's matcher.
+    """
+    matcher = matcher or get_matcher()
+    analysis = matcher.analyze_series(messages)
+    needs_llm = ((analysis["Confidence"] < min_confidence) | analysis["Fuzzy"]).to_numpy()
+    result = analysis[["AI_Category", "AI_Labels", "Severity"]].copy()
+    result.insert(1, "AI_Source", np.where(needs_llm, "llm", "keyword"))
+
+    if needs_llm.any():
+        llm_categories = pd.Series(llm_classify(messages[needs_llm]).to_numpy(), dtype=object)
+        answered = llm_categories.map(lambda category: isinstance(category, str)).to_numpy(dtype=bool)
+        rows = np.flatnonzero(needs_llm)[answered]
+        llm_categories = llm_categories[answered].reset_index(drop=True)
+        result.iloc[np.flatnonzero(needs_llm)[~answered], result.columns.get_loc("AI_Source")] = "keyword-fallback"
+        keyword_labels = pd.Series(result["AI_Labels"].iloc[rows].to_numpy(), dtype=object)
+        # The LLM's category leads; keyword categories it did not pick are kept as extra labels
+        labels = llm_categories.copy()
+        for i, keyword_label in enumerate(keyword_labels):
+            if analysis["Confidence"].iat[rows[i]] > 0:
+                extra = [c for c in keyword_label.split(LABEL_SEPARATOR) if c != llm_categories[i]]
+                labels[i] = LABEL_SEPARATOR.join([llm_categories[i]] + extra)
+        result.iloc[rows, result.columns.get_loc("AI_Category")] = llm_categories.to_numpy()
+        result.iloc[rows, result.columns.get_loc("AI_Labels")] = labels.to_numpy()
+        result.iloc[rows, result.columns.get_loc("Severity")] = matcher.severity_of_labels(labels).to_numpy()
+
+    total = len(messages)
+    llm_rows = int((result["AI_Source"] == "llm").sum())
+    fallback_rows = int((result["AI_Source"] == "keyword-fallback").sum())
+    keyword_rows = total - llm_rows - fallback_rows
+    stats = {
+        "rows": total,
+        "keyword_rows": keyword_rows,
+        "llm_rows": llm_rows,
+        "fallback_rows": fallback_rows,
+        "keyword_share": keyword_rows / total if total else 0.0,
+        "llm_share": llm_rows / total if total else 0.0,
+        "fallback_share": fallback_rows / total if total else 0.0,
+    }
+    return result, stats
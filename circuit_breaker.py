@@ -0,0 +1,139 @@
+# circuit_breaker.py
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+# ---------- Config ----------
+load_dotenv()
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD") or 5)
+# Calls slower than this (seconds) count as failures even when they succeed
+BREAKER_SLOW_CALL_SECONDS = float(os.getenv("BREAKER_SLOW_CALL_SECONDS") or 20)
+# How long the breaker stays open before letting a probe request through
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS") or 30)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling the protected function while the breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker. Opens after `failure_threshold` consecutive
+    failures or slow calls. Once `reset_seconds` have passed it lets a single
+    probe call through: success closes it again, failure reopens it. Only the
+    probe's own outcome does that; calls that started before the breaker last
+    opened are counted in `stats` but change nothing.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, slow_call_seconds=BREAKER_SLOW_CALL_SECONDS,
+                 reset_seconds=BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        # Bumped every time the breaker opens; a permit remembers the one it was given under
+        self.generation = 0
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+        self.probe_done = threading.Condition(self.lock)
+        self.stats = {"calls": 0, "failures": 0, "slow_calls": 0, "short_circuited": 0, "opened": 0}
+
+    def allow_request(self):
+        """
+        Permit for one call, or None while the breaker is open. Once half-open the
+        first caller gets the probe permit and later callers wait for the probe's
+        outcome: a permit if it closed the breaker, None if it reopened it.
+        Every permit must end in `call_allowed`, `record_success`,
+        `record_failure` or `release`.
+        """
+        with self.lock:
+            while True:
+                if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                    self.state = HALF_OPEN
+                if self.state == CLOSED:
+                    return (self.generation, False)
+                if self.state == HALF_OPEN and not self.probe_in_flight:
+                    self.probe_in_flight = True
+                    return (self.generation, True)
+                if self.state == HALF_OPEN:
+                    self.probe_done.wait()
+                    continue
+                self.stats["short_circuited"] += 1
+                return None
+
+    def _open(self):
+        if self.state != OPEN:
+            self.stats["opened"] += 1
+            self.generation += 1
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+
+    def _settle(self, permit):
+        """
+        Whether the outcome of the call made with permit may change the state.
+        """
+        generation, probe = permit
+        if probe:
+            self.probe_in_flight = False
+            self.probe_done.notify_all()
+            return True
+        # Calls that started before the breaker last opened say nothing about now
+        return generation == self.generation
+
+    def release(self, permit):
+        """
+        Give back a permit that was not used for a call.
+        """
+        with self.lock:
+            if permit[1]:
+                self.probe_in_flight = False
+                self.probe_done.notify_all()
+
+    def record_success(self, permit, seconds):
+        with self.lock:
+            self.stats["calls"] += 1
+            slow = seconds > self.slow_call_seconds
+            if slow:
+                self.stats["slow_calls"] += 1
+            if not self._settle(permit):
+                return
+            if slow:
+                self._record_failure(permit[1])
+                return
+            self.failures = 0
+            self.state = CLOSED
+
+    def record_failure(self, permit):
+        with self.lock:
+            self.stats["calls"] += 1
+            self.stats["failures"] += 1
+            if self._settle(permit):
+                self._record_failure(permit[1])
+
+    def _record_failure(self, probe):
+        self.failures += 1
+        if probe or self.failures >= self.failure_threshold:
+            self._open()
+
+    def call_allowed(self, permit, func, *args, **kwargs):
+        """
+        Call func with a permit from `allow_request`, recording the outcome.
+        Lets callers check the breaker before waiting on a rate limiter.
+        """
+        start = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure(permit)
+            raise
+        self.record_success(permit, time.monotonic() - start)
+        return result
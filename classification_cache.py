@@ -0,0 +1,124 @@
+# classification_cache.py
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+# ---------- Config ----------
+load_dotenv()
+CLASSIFICATION_CACHE_FILE = os.getenv("CLASSIFICATION_CACHE_FILE", "classification_cache.db")
+CACHE_MEMORY_ENTRIES = int(os.getenv("CACHE_MEMORY_ENTRIES") or 50000)
+CACHE_MAX_ROWS = int(os.getenv("CACHE_MAX_ROWS") or 1000000)
+
+
+def normalize_message(text):
+    return re.sub(r"\s+", " ", str(text)).strip().lower()
+
+
+def cache_key(text, model, prompt_version):
+    raw = f"{model}\x1f{prompt_version}\x1f{normalize_message(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ---------- Two-tier cache ----------
+class ClassificationCache:
+    """
+    Category cache keyed by a hash of the normalized message, model and prompt version.
+    An in-process LRU sits in front of a SQLite table. The table is trimmed to
+    `max_rows` by least-recent use; hits in either tier count as a use.
+    """
+
+    def __init__(self, path=CLASSIFICATION_CACHE_FILE, memory_entries=CACHE_MEMORY_ENTRIES, max_rows=CACHE_MAX_ROWS):
+        self.memory_entries = memory_entries
+        self.max_rows = max_rows
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS classifications ("
+            "key TEXT PRIMARY KEY, category TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_classifications_last_used ON classifications(last_used)")
+        self.conn.commit()
+
+    def _remember(self, key, category):
+        self.memory[key] = category
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def get_many(self, texts, model, prompt_version):
+        """
+        Look up texts. Returns {text: category} for the texts that are cached.
+        """
+        keys = {text: cache_key(text, model, prompt_version) for text in texts}
+        found = {}
+        with self.lock:
+            missing = {}
+            # Keys to mark as used on disk, so eviction there follows memory-tier hits too
+            used = set()
+            for text, key in keys.items():
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[text] = self.memory[key]
+                    self.stats["memory_hits"] += 1
+                    used.add(key)
+                else:
+                    missing.setdefault(key, []).append(text)
+
+            key_list = list(missing)
+            now = time.time()
+            # SQLite caps bound parameters per statement, so look up in slices
+            for start in range(0, len(key_list), 500):
+                part = key_list[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self.conn.execute(
+                    f"SELECT key, category FROM classifications WHERE key IN ({placeholders})", part
+                ).fetchall()
+                for key, category in rows:
+                    self._remember(key, category)
+                    used.add(key)
+                    for text in missing.pop(key):
+                        found[text] = category
+                        self.stats["disk_hits"] += 1
+            if used:
+                self.conn.executemany(
+                    "UPDATE classifications SET last_used = ? WHERE key = ?", [(now, key) for key in used]
+                )
+            self.conn.commit()
+            self.stats["misses"] += sum(len(texts) for texts in missing.values())
+        return found
+
+    def put_many(self, labels, model, prompt_version):
+        """
+        Store {text: category} pairs and evict the least recently used rows past `max_rows`.
+        """
+        if not labels:
+            return
+        now = time.time()
+        rows = [(cache_key(text, model, prompt_version), category, now) for text, category in labels.items()]
+        with self.lock:
+            for key, category, _ in rows:
+                self._remember(key, category)
+            self.conn.executemany("INSERT OR REPLACE INTO classifications (key, category, last_used) VALUES (?, ?, ?)", rows)
+            count = self.conn.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+            if count > self.max_rows:
+                excess = count - self.max_rows
+                self.conn.execute(
+                    "DELETE FROM classifications WHERE key IN "
+                    "(SELECT key FROM classifications ORDER BY last_used LIMIT ?)", (excess,)
+                )
+                self.stats["evictions"] += excess
+            self.conn.commit()
+
+    def hit_rate(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
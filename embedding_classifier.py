@@ -0,0 +1,229 @@
+# embedding_classifier.py
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from local_classifier import evaluation_report, hash_features, load_training_data
+from ticket_store import TICKET_STORE, open_ticket_store
+
+# ---------- Config ----------
+load_dotenv()
+EMBEDDING_INDEX_FILE = os.getenv("EMBEDDING_INDEX_FILE", "exemplar_index.npz")
+EMBEDDING_MIN_CONFIDENCE = float(os.getenv("EMBEDDING_MIN_CONFIDENCE") or 0.8)
+EMBEDDING_DIM = 256
+NEIGHBOURS = 5
+# Memory a search may spend per block of query scores; the queries are chunked to fit
+SEARCH_CHUNK_BYTES = int(os.getenv("EMBEDDING_SEARCH_CHUNK_BYTES") or 256 * 2**20)
+# A score block costs float32 scores, their negated copy and int64 argpartition output per cell
+SCORE_CELL_BYTES = 16
+
+
+# ---------- Local embedding ----------
+def embed(messages, dim=EMBEDDING_DIM):
+    """
+    Dense, L2-normalized embeddings of a Series of messages. The hashed n-gram
+    features of local_classifier are folded into `dim` signed buckets, which is
+    a random projection that keeps texts sharing words and character trigrams close.
+    """
+    indptr, indices, values = hash_features(messages)
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    signs = np.where((indices // dim) % 2 == 0, 1.0, -1.0).astype(np.float32)
+    vectors = np.zeros((len(indptr) - 1, dim), dtype=np.float32)
+    np.add.at(vectors, (rows, indices % dim), signs * values)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+# ---------- Vector index ----------
+def _chunk_rows(columns):
+    """
+    Query rows per score block against `columns` vectors within SEARCH_CHUNK_BYTES.
+    """
+    return max(1, SEARCH_CHUNK_BYTES // (SCORE_CELL_BYTES * max(columns, 1)))
+
+
+def _top_k(scores, k):
+    """
+    (scores, column positions) of the k best columns per row of a score block, best first.
+    """
+    k = min(k, scores.shape[1])
+    keep = np.argpartition(-scores, k - 1, axis=1)[:, :k] if scores.shape[1] > k else \
+        np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    top_scores = np.take_along_axis(scores, keep, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(keep, order, axis=1)
+
+
+def _merge_top_k(best_scores, best_ids, scores, ids, k):
+    """
+    Merge candidate (scores, ids), each at most k wide, into the running per-row top-k, best first.
+    """
+    top_scores, positions = _top_k(np.concatenate([best_scores, scores], axis=1), k)
+    return top_scores, np.take_along_axis(np.concatenate([best_ids, ids], axis=1), positions, axis=1)
+
+
+class VectorIndex:
+    """
+    In-memory cosine-similarity index over unit vectors. Search is a batched
+    matrix product; with `build_ivf` the vectors are also partitioned by k-means
+    so a query only scans the `n_probe` closest partitions.
+    """
+
+    def __init__(self, vectors):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.centroids = None
+        self.assignment = None
+        self.lists = None
+
+    def build_ivf(self, n_lists=None, iterations=10, seed=0):
+        n_lists = n_lists or max(1, int(np.sqrt(len(self.vectors))))
+        n_lists = min(n_lists, len(self.vectors))
+        rng = np.random.RandomState(seed)
+        centroids = self.vectors[rng.choice(len(self.vectors), n_lists, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(self.vectors @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = self.vectors[assignment == c]
+                if len(members):
+                    mean = members.mean(axis=0)
+                    centroids[c] = mean / max(np.linalg.norm(mean), 1e-12)
+        return self.set_partitions(centroids, np.argmax(self.vectors @ centroids.T, axis=1))
+
+    def set_partitions(self, centroids, assignment):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.assignment = np.asarray(assignment, dtype=np.int64)
+        self.lists = [np.flatnonzero(self.assignment == c) for c in range(len(self.centroids))]
+        return self
+
+    def search(self, queries, k=NEIGHBOURS, n_probe=4):
+        """
+        Returns (scores, ids) of the k most similar vectors per query, best first.
+        """
+        k = min(k, len(self.vectors))
+        if self.centroids is None:
+            scores_out, ids_out = [], []
+            step = _chunk_rows(len(self.vectors))
+            for start in range(0, len(queries), step):
+                chunk = queries[start:start + step]
+                # Column positions are the vector ids
+                s, i = _top_k(chunk @ self.vectors.T, k)
+                scores_out.append(s)
+                ids_out.append(i.astype(np.int64))
+            return np.concatenate(scores_out), np.concatenate(ids_out)
+
+        # IVF: each partition is scanned once for all queries that probe it
+        n_probe = min(n_probe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        for c, members in enumerate(self.lists):
+            rows = np.flatnonzero((probes == c).any(axis=1))
+            if len(rows) == 0 or len(members) == 0:
+                continue
+            # Only the partition's own top-k is merged into the running results
+            step = _chunk_rows(len(members))
+            for start in range(0, len(rows), step):
+                block = rows[start:start + step]
+                scores, positions = _top_k(queries[block] @ self.vectors[members].T, k)
+                best_scores[block], best_ids[block] = _merge_top_k(
+                    best_scores[block], best_ids[block], scores, members[positions], k
+                )
+        return best_scores, best_ids
+
+
+# ---------- Nearest-exemplar classifier ----------
+class ExemplarClassifier:
+    """
+    Labels complaints by a similarity-weighted vote of their nearest labelled exemplars.
+    """
+
+    def __init__(self, index, labels):
+        self.index = index
+        self.labels = np.asarray(labels, dtype=object)
+        self.classes = sorted(set(self.labels))
+        self.label_codes = pd.Categorical(self.labels, categories=self.classes).codes
+
+    @classmethod
+    def fit(cls, messages, labels, use_ivf=False):
+        index = VectorIndex(embed(messages))
+        if use_ivf:
+            index.build_ivf()
+        return cls(index, labels)
+
+    def predict_series(self, messages, k=NEIGHBOURS, n_probe=4):
+        """
+        Returns (categories, confidences) as Series aligned with the input index.
+        Confidence is the winning label's share of the neighbour similarity.
+        """
+        codes, uniques = pd.factorize(messages.fillna("").astype(str))
+        votes = np.zeros((len(uniques), len(self.classes)), dtype=np.float32)
+        if len(uniques):
+            scores, ids = self.index.search(embed(pd.Series(uniques)), k, n_probe)
+            weights = np.where(ids >= 0, np.maximum(scores, 0.0), 0.0)
+            rows = np.repeat(np.arange(len(uniques)), ids.shape[1])
+            np.add.at(votes, (rows, self.label_codes[np.maximum(ids, 0)].ravel()), weights.ravel())
+        best = votes.argmax(axis=1)
+        confidence = votes[np.arange(len(best)), best] / np.maximum(votes.sum(axis=1), 1e-12)
+        categories = np.asarray(self.classes, dtype=object)[best]
+        return (
+            pd.Series(categories[codes], index=messages.index, name=messages.name),
+            pd.Series(confidence[codes], index=messages.index, name="Confidence"),
+        )
+
+    def save(self, path=EMBEDDING_INDEX_FILE):
+        with open(path, "wb") as f:
+            partitions = {}
+            if self.index.centroids is not None:
+                partitions = {"centroids": self.index.centroids, "assignment": self.index.assignment}
+            np.savez(f, vectors=self.index.vectors, labels=self.labels.astype(str), **partitions)
+
+    @classmethod
+    def load(cls, path=EMBEDDING_INDEX_FILE):
+        with np.load(path) as data:
+            index = VectorIndex(data["vectors"])
+            if "centroids" in data.files:
+                index.set_partitions(data["centroids"], data["assignment"])
+            return cls(index, data["labels"].tolist())
+
+
+# ---------- CLI ----------
+def main():
+    parser = argparse.ArgumentParser(description="Build or evaluate the nearest-exemplar complaint classifier.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Embed labelled complaints into an exemplar index")
+    build.add_argument("--data", required=True, help="CSV with Complaint_ID, Message and the label column")
+    build.add_argument("--tickets", choices=["sqlite", "csv", "none"], default=TICKET_STORE,
+                       help="Ticket store whose history fills in missing labels")
+    build.add_argument("--label-column", default="AI_Category")
+    build.add_argument("--index", default=EMBEDDING_INDEX_FILE)
+    build.add_argument("--ivf", action="store_true", help="Partition the index with k-means for faster search")
+
+    evaluate = sub.add_parser("evaluate", help="Evaluate an exemplar index on labelled complaints")
+    evaluate.add_argument("--data", required=True)
+    evaluate.add_argument("--label-column", default="AI_Category")
+    evaluate.add_argument("--index", default=EMBEDDING_INDEX_FILE)
+    evaluate.add_argument("--k", type=int, default=NEIGHBOURS)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        tickets = open_ticket_store(args.tickets) if args.tickets != "none" else None
+        messages, labels = load_training_data(args.data, tickets, args.label_column)
+        # Identical exemplars add nothing to the vote but cost search time
+        exemplars = pd.DataFrame({"Message": messages, "Label": labels}).drop_duplicates()
+        ExemplarClassifier.fit(exemplars["Message"], exemplars["Label"], use_ivf=args.ivf).save(args.index)
+        print(f"Indexed {len(exemplars)} exemplars to {args.index}")
+    else:
+        messages, labels = load_training_data(args.data, None, args.label_column)
+        start = time.perf_counter()
+        classifier = ExemplarClassifier.load(args.index)
+        loaded = time.perf_counter()
+        predicted, _ = classifier.predict_series(messages, k=args.k)
+        print(f"Index loaded in {(loaded - start) * 1000:.1f} ms")
+        print(evaluation_report(labels, predicted, time.perf_counter() - loaded))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# evaluate_classifiers.py
+import argparse
+import os
+import time
+import openai
+import pandas as pd
+from dotenv import load_dotenv
+from cascade_classifier import classify_cascade
+from embedding_classifier import EMBEDDING_INDEX_FILE, ExemplarClassifier
+from fake_openai_server import start_fake_server
+from keyword_classifier import get_matcher
+from llm_classifier import (
+    OPENAI_BATCH_SIZE, OPENAI_MODEL, PROMPT_MODE, PROMPT_MODES, TokenUsage, classify_batch, estimate_tokens
+)
+from llm_engine import (
+    OPENAI_MAX_WORKERS, OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE, RateLimiter, run_batches
+)
+from local_classifier import (
+    LOCAL_MODEL_FILE, LocalClassifier, category_metrics, confusion_matrix, load_training_data
+)
+
+# Runs every classifier backend over a labelled golden CSV (complaints.csv schema plus
+# a label column) and reports accuracy, per-category precision/recall, the confusion
+# matrix, rows/sec and cost per 1k complaints, so backends can be compared like for like.
+
+# ---------- Config ----------
+load_dotenv()
+# USD per 1M prompt / completion tokens
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+
+# ---------- Metrics ----------
+def cost_per_1k(usage, rows, model):
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    dollars = (usage.prompt_tokens * prompt_price + usage.completion_tokens * completion_price) / 1e6
+    return dollars / rows * 1000 if rows else 0.0
+
+
+# ---------- Backends ----------
+def openai_classifier(args, usage, failures):
+    """
+    Series -> Series classifier that batches distinct texts through OpenAI concurrently,
+    under the app's RPM/TPM limits. Rows without an answer are left missing and
+    the failed requests are appended to `failures`, so outages are reported
+    apart from wrong answers.
+    """
+    def classify(messages):
+        texts = messages.fillna("").astype(str)
+        unique_texts = list(dict.fromkeys(texts))
+        chunks = [unique_texts[start:start + args.batch_size] for start in range(0, len(unique_texts), args.batch_size)]
+        answered, errors = run_batches(
+            chunks, lambda chunk: classify_batch(chunk, model=args.model_name, mode=args.prompt_mode, usage=usage),
+            args.workers, RateLimiter(args.requests_per_minute, args.tokens_per_minute),
+            cost=lambda chunk: estimate_tokens(chunk, args.prompt_mode)
+        )
+        failures.extend(error for _, error in errors)
+        labels = {}
+        for chunk, categories in answered:
+            if categories is not None:
+                labels.update(zip(chunk, categories))
+        return texts.map(labels)
+    return classify
+
+
+def available_backends(args):
+    """
+    (name, classify, uses_openai) for every backend that can run with the given
+    arguments. classify(messages, usage, failures) returns a Series of categories.
+    """
+    backends = [("keyword rules", lambda messages, usage, failures: get_matcher().classify_series(messages), False)]
+    if os.path.exists(args.model):
+        model = LocalClassifier.load(args.model)
+        backends.append(("local model", lambda messages, usage, failures: model.predict_series(messages)[0], False))
+    if os.path.exists(args.index):
+        exemplars = ExemplarClassifier.load(args.index)
+        backends.append((
+            "nearest exemplars", lambda messages, usage, failures: exemplars.predict_series(messages)[0], False
+        ))
+    if args.openai != "skip":
+        backends.append((
+            "openai", lambda messages, usage, failures: openai_classifier(args, usage, failures)(messages), True
+        ))
+        backends.append((
+            "keyword rules + openai",
+            lambda messages, usage, failures: classify_cascade(
+                messages, openai_classifier(args, usage, failures)
+            )[0]["AI_Category"],
+            True,
+        ))
+    return backends
+
+
+# ---------- Runner ----------
+def evaluate(messages, labels, args):
+    summary = []
+    for name, classify, uses_openai in available_backends(args):
+        if args.backends and not any(b in name for b in args.backends):
+            continue
+        usage = TokenUsage()
+        failures = []
+        start = time.perf_counter()
+        predicted = classify(messages, usage, failures)
+        elapsed = time.perf_counter() - start
+        # Rows whose request failed are not scored; they are reported on their own
+        answered = predicted.notna().to_numpy()
+        expected, predicted = labels[answered], predicted[answered].astype(str)
+        accuracy = float((predicted.to_numpy() == expected.to_numpy()).mean()) if len(expected) else 0.0
+        metrics = category_metrics(expected, predicted)
+
+        print(f"\n=== {name} ===")
+        print(f"Rows: {len(labels)}  Accuracy: {accuracy:.3f}  Rows/sec: {len(labels) / elapsed if elapsed else 0.0:,.0f}")
+        if not answered.all():
+            print(f"Unanswered rows (not scored): {int((~answered).sum())} from {len(failures)} failed request(s)"
+                  + (f"; last error: {failures[-1]}" if failures else ""))
+        print(metrics.to_string(index=False))
+        print(confusion_matrix(expected, predicted).to_string())
+        summary.append({
+            "backend": name, "rows": len(labels), "unanswered_rows": int((~answered).sum()),
+            "failed_requests": len(failures), "accuracy": round(accuracy, 3),
+            "macro_f1": round(float(metrics["F1"].mean()) if len(metrics) else 0.0, 3),
+            "rows_per_sec": round(len(labels) / elapsed if elapsed else 0.0, 1),
+            "openai_requests": usage.requests, "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "cost_per_1k_usd": round(cost_per_1k(usage, len(labels), args.model_name), 5) if uses_openai else 0.0,
+        })
+    return pd.DataFrame(summary)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare classifier backends on a labelled golden set.")
+    parser.add_argument("--golden", required=True, help="CSV in the complaints.csv schema plus the label column")
+    parser.add_argument("--label-column", default="AI_Category")
+    parser.add_argument("--backends", nargs="*", help="Only run backends whose name contains one of these strings")
+    parser.add_argument("--model", default=LOCAL_MODEL_FILE, help="Local model file; skipped when missing")
+    parser.add_argument("--index", default=EMBEDDING_INDEX_FILE, help="Exemplar index file; skipped when missing")
+    parser.add_argument("--openai", choices=["skip", "fake", "real"], default="skip",
+                        help="Run the OpenAI backends against the real API, the local fake server, or not at all")
+    parser.add_argument("--model-name", default=OPENAI_MODEL, help="OpenAI model, also used to price tokens")
+    parser.add_argument("--batch-size", type=int, default=OPENAI_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=OPENAI_MAX_WORKERS)
+    parser.add_argument("--requests-per-minute", type=int, default=OPENAI_REQUESTS_PER_MINUTE)
+    parser.add_argument("--tokens-per-minute", type=int, default=OPENAI_TOKENS_PER_MINUTE)
+    parser.add_argument("--prompt-mode", choices=PROMPT_MODES, default=PROMPT_MODE)
+    parser.add_argument("--output", help="Write the summary to this CSV")
+    args = parser.parse_args()
+
+    messages, labels = load_training_data(args.golden, None, args.label_column)
+    messages, labels = messages.reset_index(drop=True), labels.reset_index(drop=True)
+    server = None
+    if args.openai == "fake":
+        server, openai.api_base = start_fake_server(latency=0.05)
+        openai.api_key = "sk-fake-evaluation"
+    elif args.openai == "real":
+        openai.api_key = os.getenv("OPENAI_API_KEY")
+        if not openai.api_key:
+            parser.error("--openai real needs OPENAI_API_KEY")
+    try:
+        summary = evaluate(messages, labels, args)
+    finally:
+        if server is not None:
+            server.shutdown()
+    print("\n=== Summary ===")
+    print(summary.to_string(index=False))
+    if args.output:
+        summary.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# fake_openai_server.py
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from keyword_classifier import get_matcher
+from llm_classifier import CATEGORY_CODES, COMPACT_INSTRUCTIONS
+
+# Local stand-in for the ChatCompletion endpoint, used by the benchmarks.
+# Answers are produced by the keyword rules, so every prompt format the app sends
+# gets a well-formed, deterministic reply.
+
+
+def answer_messages(messages):
+    """
+    Build the reply the real model would give for one of our requests.
+    """
+    system = " ".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+    prompt = "\n".join(str(m.get("content", "")) for m in messages if m.get("role") != "system")
+    matcher = get_matcher()
+    if system.startswith(COMPACT_INSTRUCTIONS):
+        code_of = {category: code for code, category in CATEGORY_CODES.items()}
+        return "".join(code_of[matcher.classify(line)] for line in prompt.split("\n"))
+    if "\nComplaints:\n" in prompt:
+        answers = {}
+        for line in prompt.split("\nComplaints:\n", 1)[1].splitlines():
+            match = re.match(r"(\d+)\. (.*)", line)
+            if match:
+                answers[match.group(1)] = matcher.classify(json.loads(match.group(2)))
+        return json.dumps(answers)
+    match = re.search(r"Complaint: \"(.*)\"", prompt, re.S)
+    return matcher.classify(match.group(1) if match else prompt)
+
+
+class FakeChatCompletionHandler(BaseHTTPRequestHandler):
+    # Set per server by start_fake_server
+    latency = 0.05
+    jitter = 0.2
+    error_rate = 0.0
+    rate_limit_rate = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self._send(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+
+        time.sleep(max(0.0, random.gauss(self.latency, self.latency * self.jitter)))
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            self._send(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}}, {"Retry-After": "1"})
+            return
+        if roll < self.rate_limit_rate + self.error_rate:
+            self._send(500, {"error": {"message": "Internal server error", "type": "server_error"}})
+            return
+
+        messages = request.get("messages", [])
+        content = answer_messages(messages)
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = max(1, len(content) // 4)
+        self._send(200, {
+            "id": f"chatcmpl-fake-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+
+def start_fake_server(latency=0.05, error_rate=0.0, rate_limit_rate=0.0, host="127.0.0.1", port=0):
+    """
+    Start the fake server on a daemon thread.
+    Returns (server, api_base) where api_base can be assigned to openai.api_base.
+    """
+    handler = type("ConfiguredHandler", (FakeChatCompletionHandler,), {
+        "latency": latency, "error_rate": error_rate, "rate_limit_rate": rate_limit_rate,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake OpenAI ChatCompletion endpoint.")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean response latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429")
+    args = parser.parse_args()
+
+    server, api_base = start_fake_server(args.latency, args.error_rate, args.rate_limit_rate, port=args.port)
+    print(f"Fake OpenAI API at {api_base} (set OPENAI_API_BASE to use it). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,560 @@
+# keyword_classifier.py
+import gzip
+import json
+import os
+import re
+import threading
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from language_detection import ENGLISH_SEED, detect_language, detect_languages
+
+# ---------- Rule config ----------
+load_dotenv()
+DEFAULT_CATEGORY = "Customer Issue"
+# Severity of a category the rules do not give one, including the default category.
+# A complaint's severity is the sum over all categories it mentions.
+DEFAULT_SEVERITY = 1
+# Joins the categories of a multi-label complaint in the AI_Labels column
+LABEL_SEPARATOR = "; "
+# Versioned rule table; edits are picked up on the next call to get_matcher
+RULES_FILE = os.getenv("CLASSIFIER_RULES_FILE", "classifier_rules.json")
+
+# Confidence reported for a message with no keyword (default category), with keywords
+# from a single category, and with keywords from several competing categories
+NO_MATCH_CONFIDENCE = 0.0
+SINGLE_MATCH_CONFIDENCE = 1.0
+CONFLICT_CONFIDENCE = 0.5
+# Confidence of a message whose categories were only found through corrected typos.
+# It is below the cascade's default minimum, so such rows are still checked by the LLM.
+FUZZY_MATCH_CONFIDENCE = 0.7
+
+# Typo tolerance: words within this many edits (a swap of neighbouring letters counts
+# as one) of a keyword count as that keyword. A typo must keep the keyword's first
+# letter, two edits are allowed only when both words have FUZZY_LONG_LENGTH+ letters,
+# and keywords shorter than FUZZY_MIN_LENGTH must match exactly.
+FUZZY_MAX_EDIT_DISTANCE = 2
+FUZZY_MIN_LENGTH = 5
+FUZZY_LONG_LENGTH = 8
+FUZZY_CACHE_ENTRIES = 1000000
+WORD_PATTERN = r"[^\W\d_]+"
+# Letters and the Indic blocks' vowel signs, which \b does not treat as word characters
+WORD_CHARS = "\\w\u0900-\u0D7F"
+
+# English word list (one lowercase word per line, gzipped; the shipped file is the
+# 128k-word English list of pyspellchecker, MIT licensed). Only words missing from
+# it are treated as typos, so "course" never becomes "courier". Without the file
+# typo tolerance is off.
+DICTIONARY_FILE = os.getenv("CLASSIFIER_DICTIONARY_FILE", "english_words.txt.gz")
+
+# Built-in rules, used when the rule file does not exist.
+# Ordered by priority: the first category with a matching keyword wins.
+KEYWORD_RULES = [
+    ("Supplier Issue", ["damage", "wrong", "missing", "color", "colour", "defect"]),
+    ("Logistics Issue", ["late", "courier", "delivery"]),
+]
+
+
+# ---------- Compiled matcher ----------
+def distinct_lowered(messages):
+    """
+    Factorize a Series of messages so repeated texts are processed once.
+    Returns (codes, lowered) where lowered[codes] rebuilds the lowercased column.
+    """
+    codes, uniques = pd.factorize(messages.fillna("").astype(str))
+    return codes, pd.Series(uniques).str.lower()
+
+
+def _alternation(words, whole_words=()):
+    """
+    Regex alternation of words; those in `whole_words` only match as whole words.
+    """
+    return "|".join(
+        rf"(?<![{WORD_CHARS}]){re.escape(word)}(?![{WORD_CHARS}])" if word in whole_words else re.escape(word)
+        for word in words
+    )
+
+
+# ---------- Typo tolerance ----------
+_dictionaries = {}
+
+
+def load_dictionary(path=DICTIONARY_FILE):
+    """
+    Real words that are never treated as typos: the word list at path plus the
+    English seed vocabulary of language_detection. Cached per process; returns
+    None when the file does not exist.
+    """
+    if path not in _dictionaries:
+        try:
+            with (gzip.open if path.endswith(".gz") else open)(path, "rt", encoding="utf-8") as f:
+                _dictionaries[path] = frozenset(line.strip().lower() for line in f if line.strip()) | set(ENGLISH_SEED)
+        except FileNotFoundError:
+            _dictionaries[path] = None
+    return _dictionaries[path]
+
+
+def _trigrams(word):
+    padded = f"${word}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def bounded_edit_distance(a, b, limit):
+    """
+    Edit distance between a and b where insertions, deletions, substitutions and
+    swaps of neighbouring characters cost 1. Stops early and returns limit + 1
+    once the distance is known to exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class TypoCorrector:
+    """
+    Rewrites misspelled words to the rule keyword they were meant to be
+    ("damged" -> "damage", "delivry" -> "delivery"). Only words missing from the
+    `dictionary` of real words are rewritten, so "delivered" stays "delivered"
+    and "course" stays "course". A typo may be of a keyword's plural or past
+    form ("dammaged" -> "damaged" -> "damage"). Candidates come from a
+    character-trigram index over those forms and are confirmed with a bounded
+    edit distance. Each distinct word is looked up once and the
+    result is memoized, so bulk runs only pay for words not seen before.
+    """
+
+    def __init__(self, keywords, dictionary, protected=(), max_distance=FUZZY_MAX_EDIT_DISTANCE):
+        self.max_distance = max_distance
+        self.keywords = sorted({k for k in keywords if len(k) >= FUZZY_MIN_LENGTH and re.fullmatch(WORD_PATTERN, k)})
+        # Words that already contain a keyword, or belong to a rule phrase, are never rewritten
+        self.exact = re.compile(_alternation(sorted(keywords, key=len, reverse=True))) if keywords else None
+        self.protected = set(protected) | set(dictionary)
+        # Form a typo is measured against -> the keyword it stands for
+        self.forms = {}
+        for keyword in self.keywords:
+            past = keyword + ("d" if keyword.endswith("e") else "ed")
+            for form in (past, keyword + "s", keyword):
+                self.forms[form] = keyword
+        self.index = {}
+        for form in self.forms:
+            for gram in set(_trigrams(form)):
+                self.index.setdefault(gram, []).append(form)
+        self.corrections = {}
+
+    def allowed_distance(self, word, keyword):
+        # Typos rarely touch the first letter; requiring it keeps e.g. "image" and
+        # "manage" from turning into "damage". Short words get a single edit only.
+        if word[0] != keyword[0]:
+            return 0
+        limit = 1 if len(keyword) < FUZZY_LONG_LENGTH or len(word) < FUZZY_LONG_LENGTH else 2
+        return min(self.max_distance, limit)
+
+    def lookup(self, word):
+        """
+        Keyword that word is a misspelling of, or None.
+        """
+        if word in self.corrections:
+            return self.corrections[word]
+        best, best_distance = None, None
+        if word not in self.protected and not (self.exact and self.exact.search(word)):
+            shared = {}
+            for gram in set(_trigrams(word)):
+                for form in self.index.get(gram, ()):
+                    shared[form] = shared.get(form, 0) + 1
+            for form, count in shared.items():
+                limit = self.allowed_distance(word, form)
+                if not limit:
+                    continue
+                # Each edit changes at most 4 of the form's padded trigrams
+                if abs(len(form) - len(word)) > limit or count < len(form) - 4 * limit:
+                    continue
+                distance = bounded_edit_distance(word, form, limit)
+                if distance <= limit and (best is None or distance < best_distance):
+                    best, best_distance = self.forms[form], distance
+        if len(self.corrections) >= FUZZY_CACHE_ENTRIES:
+            self.corrections.clear()
+        self.corrections[word] = best
+        return best
+
+    def correct(self, lowered):
+        """
+        Correct the words of one lowercased text.
+        """
+        return re.sub(WORD_PATTERN, lambda m: self.lookup(m.group(0)) or m.group(0), lowered)
+
+    def correct_series(self, lowered):
+        """
+        Correct a Series of distinct lowercased texts. Only texts containing a
+        misspelled word are rewritten.
+        """
+        if not self.keywords or lowered.empty:
+            return lowered
+        # Whitespace split first: it is much faster than a regex over every text,
+        # and the regex then only runs over the distinct tokens
+        tokens = set(" ".join(lowered.tolist()).split())
+        typos = {}
+        for word in set(re.findall(WORD_PATTERN, " ".join(tokens))):
+            keyword = self.lookup(word)
+            if keyword is not None:
+                typos[word] = keyword
+        if not typos:
+            return lowered
+        pattern = re.compile(r"\b(?:" + _alternation(sorted(typos, key=len, reverse=True)) + r")\b")
+        rows = lowered.str.contains(pattern.pattern, regex=True, na=False).to_numpy(dtype=bool)
+        values = lowered.to_numpy(dtype=object).copy()
+        values[rows] = [pattern.sub(lambda m: typos[m.group(0)], text) for text in values[rows]]
+        return pd.Series(values, index=lowered.index, dtype=lowered.dtype)
+
+
+class KeywordMatcher:
+    """
+    Matches all rule keywords with a single compiled regex.
+    The pattern is built once, so each message is scanned once no matter
+    how many keywords the rules contain.
+
+    `negations` maps a category to phrases that cancel its keywords: a keyword
+    occurrence inside one of them ("no damage") does not count for that category.
+    With `max_edit_distance` above 0 and a word list (see load_dictionary),
+    misspelled keywords are corrected first.
+    `severities` maps a category to its severity weight. Keywords and negation
+    phrases in `whole_words` only match as whole words (short romanized words
+    like "deri" would otherwise match inside "considering").
+    """
+
+    def __init__(self, rules=KEYWORD_RULES, default=DEFAULT_CATEGORY, negations=None, version=None,
+                 max_edit_distance=FUZZY_MAX_EDIT_DISTANCE, severities=None, whole_words=()):
+        self.default = default
+        whole_words = {word.lower() for word in whole_words}
+        self.version = version
+        self.categories = [category for category, _ in rules]
+        self.severities = {category: DEFAULT_SEVERITY for category in self.categories + [default]}
+        self.severities.update(severities or {})
+        self.keyword_priority = {}
+        for priority, (_, keywords) in enumerate(rules):
+            for word in keywords:
+                word = word.lower()
+                # A keyword listed under several categories keeps its highest priority
+                self.keyword_priority.setdefault(word, priority)
+
+        # Alternatives are ordered by priority, so when two keywords start at the
+        # same position the higher-priority one is reported. The lookahead makes
+        # matches overlap, which keeps the semantics of `word in text`.
+        ordered = sorted(self.keyword_priority, key=lambda w: (self.keyword_priority[w], -len(w)))
+        self.pattern = re.compile(f"(?=({_alternation(ordered, whole_words)}))") if ordered else None
+
+        # Negation phrases per category priority, longest first so the widest phrase is removed
+        self.negation_patterns = {}
+        for priority, category in enumerate(self.categories):
+            phrases = sorted({p.lower() for p in (negations or {}).get(category, []) if p}, key=len, reverse=True)
+            if phrases:
+                self.negation_patterns[priority] = _alternation(phrases, whole_words)
+        self.compiled_negations = {p: re.compile(n) for p, n in self.negation_patterns.items()}
+
+        # One plain alternation per category for column-at-a-time classification
+        self.category_patterns = []
+        for priority, category in enumerate(self.categories):
+            words = [w for w, p in self.keyword_priority.items() if p == priority]
+            if words:
+                self.category_patterns.append(
+                    (category, _alternation(words, whole_words), self.negation_patterns.get(priority))
+                )
+
+        self.corrector = None
+        dictionary = load_dictionary() if max_edit_distance and self.keyword_priority else None
+        if dictionary is not None:
+            phrases = list(self.keyword_priority) + [p for n in (negations or {}).values() for p in n]
+            protected = {word for phrase in phrases for word in re.findall(WORD_PATTERN, phrase.lower())}
+            self.corrector = TypoCorrector(list(self.keyword_priority), dictionary, protected, max_edit_distance)
+
+    def _lower(self, text):
+        lowered = text.lower()
+        return self.corrector.correct(lowered) if self.corrector else lowered
+
+    def _distinct(self, messages):
+        codes, lowered = distinct_lowered(messages)
+        return codes, self.corrector.correct_series(lowered) if self.corrector else lowered
+
+    def _found_priorities(self, lowered):
+        """
+        Priorities of the categories with a keyword in lowered that is not inside a negation.
+        """
+        negated = {}
+        for priority, pattern in self.compiled_negations.items():
+            spans = [m.span() for m in pattern.finditer(lowered)]
+            if spans:
+                negated[priority] = spans
+        found = set()
+        for match in self.pattern.finditer(lowered):
+            word = match.group(1)
+            priority = self.keyword_priority[word]
+            if priority in found:
+                continue
+            start, end = match.start(), match.start() + len(word)
+            if any(s <= start and end <= e for s, e in negated.get(priority, ())):
+                continue
+            found.add(priority)
+        return found
+
+    def classify(self, text):
+        """
+        Return the highest-priority category whose keyword occurs in text.
+        """
+        if self.pattern is None:
+            return self.default
+        lowered = self._lower(text)
+        if not self.compiled_negations:
+            best = None
+            for match in self.pattern.finditer(lowered):
+                priority = self.keyword_priority[match.group(1)]
+                if best is None or priority < best:
+                    best = priority
+                    if best == 0:
+                        break
+        else:
+            best = min(self._found_priorities(lowered), default=None)
+        return self.default if best is None else self.categories[best]
+
+    @staticmethod
+    def _contains(lowered, pattern, negation):
+        if negation:
+            # Blank out negation phrases so their keywords no longer match
+            lowered = lowered.str.replace(negation, " ", regex=True)
+        return lowered.str.contains(pattern, regex=True, na=False).to_numpy(dtype=bool)
+
+    def _hits(self, lowered):
+        """
+        Boolean matrix with a row per text and a column per entry of category_patterns.
+        """
+        hits = np.zeros((len(lowered), len(self.category_patterns)), dtype=bool)
+        for column, (_, pattern, negation) in enumerate(self.category_patterns):
+            hits[:, column] = self._contains(lowered, pattern, negation)
+        return hits
+
+    def classify_series(self, messages):
+        """
+        Classify a whole Series of messages with vectorized string operations.
+        Returns a Series of categories aligned with the input index.
+        """
+        codes, lowered = self._distinct(messages)
+        result = np.full(len(lowered), self.default, dtype=object)
+        unresolved = np.ones(len(lowered), dtype=bool)
+        for category, pattern, negation in self.category_patterns:
+            if not unresolved.any():
+                break
+            # Only rows not claimed by a higher-priority category are scanned again
+            hits = self._contains(lowered[unresolved], pattern, negation)
+            positions = np.flatnonzero(unresolved)[hits]
+            result[positions] = category
+            unresolved[positions] = False
+        return pd.Series(result[codes], index=messages.index, name=messages.name)
+
+    def analyze_series(self, messages):
+        """
+        Everything the rules can say about each message, from one scan per category:
+        a DataFrame aligned with the input index with AI_Category, Confidence
+        (by how many distinct categories had a keyword, at most
+        FUZZY_MATCH_CONFIDENCE when one was only found through a typo), AI_Labels (every matching category, highest priority first),
+        Severity (sum of the severities of those categories) and Fuzzy (a category
+        was only found through a corrected typo, so the row is not settled).
+        Callers that stop at the rules should not label or ticket Fuzzy rows.
+        """
+        codes, raw = distinct_lowered(messages)
+        lowered = self.corrector.correct_series(raw) if self.corrector else raw
+        hits = self._hits(lowered)
+        # Rows where a category was only found after correcting a typo
+        fuzzy = np.zeros(len(lowered), dtype=bool)
+        rewritten = lowered.to_numpy(dtype=object) != raw.to_numpy(dtype=object)
+        if rewritten.any():
+            fuzzy[rewritten] = (hits[rewritten] & ~self._hits(raw[rewritten])).any(axis=1)
+        # Each distinct combination of matching categories is labelled once
+        combos, combo_codes = np.unique(np.column_stack([hits, fuzzy]), axis=0, return_inverse=True)
+        combo_codes = combo_codes.reshape(-1)
+        categories, confidences, labels, severities, fuzzies = [], [], [], [], []
+        for row in combos:
+            combo, fuzzy_only = row[:-1], row[-1]
+            matched = [self.category_patterns[c][0] for c in np.flatnonzero(combo)] or [self.default]
+            categories.append(matched[0])
+            confidence = (
+                NO_MATCH_CONFIDENCE if not combo.any() else
+                SINGLE_MATCH_CONFIDENCE if len(matched) == 1 else CONFLICT_CONFIDENCE
+            )
+            confidences.append(min(confidence, FUZZY_MATCH_CONFIDENCE) if fuzzy_only else confidence)
+            labels.append(LABEL_SEPARATOR.join(matched))
+            severities.append(sum(self.severities.get(category, DEFAULT_SEVERITY) for category in matched))
+            fuzzies.append(bool(fuzzy_only))
+        rows = combo_codes[codes]
+        return pd.DataFrame({
+            "AI_Category": np.asarray(categories, dtype=object)[rows],
+            "Confidence": np.asarray(confidences, dtype=float)[rows],
+            "AI_Labels": np.asarray(labels, dtype=object)[rows],
+            "Severity": np.asarray(severities, dtype=np.int64)[rows],
+            "Fuzzy": np.asarray(fuzzies, dtype=bool)[rows],
+        }, index=messages.index)
+
+    def severity_of_labels(self, labels):
+        """
+        Severity of each AI_Labels string in a Series.
+        """
+        split = labels.reset_index(drop=True).str.split(LABEL_SEPARATOR).explode()
+        weights = split.map(self.severities).fillna(DEFAULT_SEVERITY).astype(np.int64)
+        return pd.Series(weights.groupby(level=0).sum().to_numpy(), index=labels.index, name="Severity")
+
+    def category_counts(self, messages):
+        """
+        Number of distinct categories with a keyword in each message, as a Series.
+        """
+        codes, lowered = self._distinct(messages)
+        matched = self._hits(lowered).sum(axis=1)
+        return pd.Series(matched[codes], index=messages.index, name="Categories")
+
+
+class LanguageRoutedMatcher:
+    """
+    Sends each message to the rule set of its detected language; languages
+    without rules of their own use the base rules. Offers the same
+    classification methods as KeywordMatcher.
+    """
+
+    def __init__(self, base, language_matchers):
+        self.base = base
+        self.language_matchers = language_matchers
+        self.default = base.default
+        self.version = base.version
+        self.severities = base.severities
+
+    def for_language(self, language):
+        return self.language_matchers.get(language, self.base)
+
+    def classify(self, text):
+        return self.for_language(detect_language(text)).classify(text)
+
+    def _per_rule_set(self, messages, method):
+        """
+        Run `method` once per rule set over the rows routed to it and stitch the results back in input order.
+        """
+        languages = detect_languages(messages)
+        routes = languages.where(languages.isin(list(self.language_matchers)), "").to_numpy(dtype=object)
+        positional = messages.reset_index(drop=True)
+        parts = [getattr(self.for_language(route), method)(positional[routes == route]) for route in pd.unique(routes)]
+        if not parts:
+            return getattr(self.base, method)(messages)
+        result = pd.concat(parts).sort_index()
+        result.index = messages.index
+        return result
+
+    def classify_series(self, messages):
+        return self._per_rule_set(messages, "classify_series").rename(messages.name)
+
+    def analyze_series(self, messages):
+        return self._per_rule_set(messages, "analyze_series")
+
+    def category_counts(self, messages):
+        return self._per_rule_set(messages, "category_counts")
+
+    def severity_of_labels(self, labels):
+        return self.base.severity_of_labels(labels)
+
+
+# ---------- Rule file ----------
+def load_rules(path=RULES_FILE):
+    """
+    Build the matcher for a rule file:
+    {"version": ..., "default_category": ..., "default_severity": 1, "max_edit_distance": 2, "categories": [
+        {"name": ..., "priority": 1, "severity": 3, "keywords": [...], "negations": [...]}, ...],
+     "languages": {"hi": {"max_edit_distance": 0, "categories": [{"name": ..., "keywords": [...]}]}, ...}}
+    Lower priority numbers win; a max_edit_distance of 0 turns typo tolerance off.
+    A "languages" entry adds keywords and negations to the base categories for
+    messages detected in that language (codes from language_detection); these
+    only match as whole words.
+    """
+    with open(path, encoding="utf-8") as f:
+        table = json.load(f)
+    matcher = _matcher_from_table(table)
+    languages = table.get("languages") or {}
+    if not languages:
+        return matcher
+    return LanguageRoutedMatcher(
+        matcher, {code: _matcher_from_table(_language_table(table, rules)) for code, rules in languages.items()}
+    )
+
+
+def _language_table(table, language):
+    """
+    Rule table for one language: the base table with the language's settings,
+    keywords and negations merged in.
+    """
+    merged = {key: value for key, value in table.items() if key not in ("categories", "languages")}
+    merged.update({key: value for key, value in language.items() if key != "categories"})
+    categories = {}
+    for category in table["categories"]:
+        categories[category["name"]] = dict(
+            category, keywords=list(category.get("keywords", [])), negations=list(category.get("negations", []))
+        )
+    for extra in language.get("categories", []):
+        category = categories.setdefault(extra["name"], {"name": extra["name"], "keywords": [], "negations": []})
+        category.update({key: value for key, value in extra.items() if key not in ("keywords", "negations")})
+        category["keywords"] += extra.get("keywords", [])
+        category["negations"] += extra.get("negations", [])
+    merged["categories"] = list(categories.values())
+    merged["whole_words"] = [
+        word for extra in language.get("categories", []) for word in extra.get("keywords", []) + extra.get("negations", [])
+    ]
+    return merged
+
+
+def _matcher_from_table(table):
+    categories = sorted(table["categories"], key=lambda c: c.get("priority", 0))
+    rules = [(c["name"], c.get("keywords", [])) for c in categories]
+    negations = {c["name"]: c.get("negations", []) for c in categories}
+    default = table.get("default_category", DEFAULT_CATEGORY)
+    severities = {c["name"]: c.get("severity", DEFAULT_SEVERITY) for c in categories}
+    severities[default] = table.get("default_severity", DEFAULT_SEVERITY)
+    return KeywordMatcher(
+        rules, default, negations, table.get("version"), table.get("max_edit_distance", FUZZY_MAX_EDIT_DISTANCE),
+        severities, table.get("whole_words", ())
+    )
+
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+
+def get_matcher(path=RULES_FILE):
+    """
+    Compiled matcher for the rule file, cached per process and rebuilt only
+    when the file's mtime changes. Uses the built-in KEYWORD_RULES when the
+    file does not exist. If an edited file fails to load, the last good
+    matcher is kept and the file is retried on the next call.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+    cached = _matchers.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with _matchers_lock:
+        cached = _matchers.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        if mtime is None:
+            matcher = KeywordMatcher()
+        else:
+            try:
+                matcher = load_rules(path)
+            except (OSError, ValueError, KeyError, TypeError):
+                if cached is None:
+                    raise
+                return cached[1]
+        _matchers[path] = (mtime, matcher)
+        return matcher
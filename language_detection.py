@@ -0,0 +1,150 @@
+# language_detection.py
+import math
+import re
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+# ---------- Scripts ----------
+# Unicode blocks of the Indic scripts and the language reported for text written in them.
+# Devanagari is reported as Hindi, the most common language using it in our complaints.
+SCRIPT_LANGUAGES = [
+    (0x0900, 0x097F, "hi"), (0x0980, 0x09FF, "bn"), (0x0A00, 0x0A7F, "pa"), (0x0A80, 0x0AFF, "gu"),
+    (0x0B00, 0x0B7F, "or"), (0x0B80, 0x0BFF, "ta"), (0x0C00, 0x0C7F, "te"), (0x0C80, 0x0CFF, "kn"),
+    (0x0D00, 0x0D7F, "ml"),
+]
+INDIC_LETTER = "([\u0900-\u0D7F])"
+LANGUAGE_NAMES = {
+    "en": "English", "hinglish": "Hinglish", "hi": "Hindi", "bn": "Bengali", "pa": "Punjabi", "gu": "Gujarati",
+    "or": "Odia", "ta": "Tamil", "te": "Telugu", "kn": "Kannada", "ml": "Malayalam",
+}
+
+# ---------- Latin-script profiles ----------
+# Seed vocabularies for the character-trigram profiles that tell English from
+# romanized Hindi. Words shared by both (brand names, "saree") carry little weight.
+ENGLISH_SEED = """
+the a an and or but not no to in on of for at by as so if up out is was were are be been being have has had do does did will would should could
+can cannot this that these those it its my our your their his her we you they i me us them what which who
+when where why how very too also only just still yet again please thanks thank received receive ordered
+order item items product products package parcel delivered delivery deliver late early courier shipping
+shipped refund return returned replace replacement exchange wrong damaged damage broken torn missing color
+colour size quality defect defective bad poor worst good great excellent happy unhappy disappointed fake
+original stitching fabric material cloth different than expected picture image shown photo want need
+change address call called customer service support seller supplier money back days weeks time today
+yesterday tomorrow week month after before since with without from into about over under still never
+arrived came come coming sent send tracking status cancel cancelled payment paid charged price cost
+""".split()
+HINGLISH_SEED = """
+hai hain tha thi the ho hoga hogi hua hui hue nahi nahin nhi na mat kya kyu kyun kaise kab kahan kaun
+mera meri mere mujhe mujhko hum humko hame hamara tum tumhara aap aapka aapki apna apni uska uski unka
+ye yeh wo woh is us iska uski ko ka ki ke se me mein par pe tak aur ya lekin bhi hi toh to abhi tak
+bahut bohot bilkul ekdum accha acha achha bura kharab ganda galat sahi theek thik jaldi der deri baad
+pehle phir fir kab tak aaya aayi aaye aya ayi mila mili mile diya diye di liya liye gaya gayi gaye
+raha rahi rahe karo karna karke kiya kiye kar kardo dedo do dijiye chahiye chahie paisa paise wapas
+wapis bhejo bheja bheji mangaya mangwaya toota tuta tooti tuti phata fata phati fati rang alag naya
+purana saman samaan dukan wala wali wale bhai ji sirf kuch kuchh sab koi kabhi abhi tak pata nahi
+""".split()
+HINGLISH_MIN_SHARE = 0.4
+
+
+def _word_trigrams(word):
+    padded = f"^{word}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def _trigram_counts(words):
+    counts = Counter(gram for word in words for gram in _word_trigrams(word))
+    total = sum(counts.values())
+    return counts, total
+
+
+class LatinLanguageModel:
+    """
+    Character-trigram profiles of English and romanized Hindi. Each distinct
+    word gets a log-likelihood ratio once (memoized); a text is Hinglish when
+    more than `min_share` of its words lean towards romanized Hindi and at least
+    one is a known Hindi word, so names and rare English words alone do not
+    tip an English complaint over.
+    """
+
+    def __init__(self, english=ENGLISH_SEED, hinglish=HINGLISH_SEED, min_share=HINGLISH_MIN_SHARE):
+        self.min_share = min_share
+        self.english, self.english_total = _trigram_counts(english)
+        self.hinglish, self.hinglish_total = _trigram_counts(hinglish)
+        self.vocabulary = len(set(self.english) | set(self.hinglish)) + 1
+        # Seed words are known outright; the trigram profile only decides unseen words
+        self.scores = {word: -1.0 for word in english}
+        self.scores.update({word: 1.0 for word in hinglish if word not in self.scores})
+        self.hinglish_words = set(hinglish) - set(english)
+
+    def word_score(self, word):
+        """
+        Average per-trigram log-likelihood ratio of Hinglish over English; positive leans Hinglish.
+        """
+        if word not in self.scores:
+            grams = _word_trigrams(word)
+            ratio = sum(
+                math.log((self.hinglish[g] + 1) / (self.hinglish_total + self.vocabulary))
+                - math.log((self.english[g] + 1) / (self.english_total + self.vocabulary))
+                for g in grams
+            )
+            self.scores[word] = ratio / len(grams)
+        return self.scores[word]
+
+    def is_hinglish(self, lowered):
+        words = re.findall(r"[a-z]+", lowered)
+        if not words:
+            return False
+        if not any(w in self.hinglish_words for w in words):
+            return False
+        return sum(self.word_score(w) > 0 for w in words) / len(words) > self.min_share
+
+
+LATIN_MODEL = LatinLanguageModel()
+
+
+# ---------- Detection ----------
+def script_language(char):
+    point = ord(char)
+    for low, high, language in SCRIPT_LANGUAGES:
+        if low <= point <= high:
+            return language
+    return "en"
+
+
+def detect_language(text):
+    """
+    Language code of one message.
+    """
+    match = re.search(INDIC_LETTER, str(text))
+    if match:
+        return script_language(match.group(1))
+    return "hinglish" if LATIN_MODEL.is_hinglish(str(text).lower()) else "en"
+
+
+def detect_languages(messages):
+    """
+    Language code per message, as a Series aligned with the input index.
+    The script is found with one vectorized regex pass; only Latin-script
+    texts are scored against the trigram profiles, once per distinct text.
+    """
+    codes, uniques = pd.factorize(messages.fillna("").astype(str))
+    texts = pd.Series(uniques, dtype=object)
+    first_indic = texts.str.extract(INDIC_LETTER, expand=False)
+    languages = first_indic.map(lambda c: script_language(c) if isinstance(c, str) else None).to_numpy(dtype=object).copy()
+    latin = pd.isna(first_indic).to_numpy()
+    lowered = texts[latin].str.lower()
+    languages[latin] = ["hinglish" if LATIN_MODEL.is_hinglish(text) else "en" for text in lowered]
+    return pd.Series(languages[codes], index=messages.index, name="Language")
+
+
+def language_mix(languages):
+    """
+    Complaints and share per language for a Series of language codes.
+    """
+    counts = languages.value_counts()
+    return pd.DataFrame({
+        "Language": [LANGUAGE_NAMES.get(code, code) for code in counts.index],
+        "Complaints": counts.to_numpy(),
+        "Share": np.round(counts.to_numpy() / max(len(languages), 1), 3),
+    })
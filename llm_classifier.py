@@ -0,0 +1,195 @@
+# llm_classifier.py
+import json
+import os
+import threading
+import openai
+from dotenv import load_dotenv
+
+# ---------- Config ----------
+load_dotenv()
+CATEGORIES = ["Supplier Issue", "Logistics Issue", "Customer Issue"]
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_BATCH_SIZE = int(os.getenv("OPENAI_BATCH_SIZE") or 20)
+OPENAI_REQUEST_TIMEOUT = float(os.getenv("OPENAI_REQUEST_TIMEOUT") or 30)
+# Bump whenever the prompts change so cached answers from older prompts are not reused
+PROMPT_VERSION = "1"
+# "full" sends the descriptive prompt; "compact" asks for a one-letter category code
+PROMPT_MODES = ["full", "compact"]
+PROMPT_MODE = os.getenv("OPENAI_PROMPT_MODE", "full")
+CATEGORY_CODES = {"S": "Supplier Issue", "L": "Logistics Issue", "C": "Customer Issue"}
+
+
+# ---------- Token usage ----------
+class TokenUsage:
+    """
+    Thread-safe tally of requests and billed tokens, fed from ChatCompletion responses.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, resp):
+        usage = resp.get("usage") or {}
+        with self.lock:
+            self.requests += 1
+            self.prompt_tokens += int(usage.get("prompt_tokens") or 0)
+            self.completion_tokens += int(usage.get("completion_tokens") or 0)
+
+
+def _chat(messages, model, usage=None, max_tokens=None):
+    """
+    Send one ChatCompletion request and return the answer text.
+    """
+    extra = {"max_tokens": max_tokens} if max_tokens else {}
+    resp = openai.ChatCompletion.create(
+        model=model,
+        messages=messages,
+        temperature=0,
+        request_timeout=OPENAI_REQUEST_TIMEOUT,
+        **extra
+    )
+    if usage is not None:
+        usage.add(resp)
+    return resp["choices"][0]["message"]["content"]
+
+
+# ---------- Single complaint ----------
+def build_prompt(text):
+    return (
+        "You are an assistant that classifies customer complaint text into exactly one of these categories: "
+        "'Supplier Issue', 'Logistics Issue', 'Customer Issue'.\n\n"
+        "Return only the category text (no extra words).\n\n"
+        f"Complaint: \"{text}\""
+    )
+
+
+def normalize_answer(answer):
+    """
+    Map a free-form model answer onto one of CATEGORIES.
+    """
+    answer = answer.lower()
+    if "supplier" in answer:
+        return "Supplier Issue"
+    if "logistic" in answer:
+        return "Logistics Issue"
+    return "Customer Issue"
+
+
+def classify_text(text, model=OPENAI_MODEL, mode=PROMPT_MODE, usage=None):
+    """
+    Classify one complaint with its own ChatCompletion request. In compact mode an
+    answer that is not a single category code is retried with the full prompt.
+    OpenAI errors are raised to the caller.
+    """
+    if mode == "compact":
+        categories = parse_compact_answer(_chat(build_compact_messages([text]), model, usage, max_tokens=1), 1)
+        if categories is not None:
+            return categories[0]
+    answer = _chat([{"role": "user", "content": build_prompt(text)}], model, usage)
+    return normalize_answer(answer.strip())
+
+
+# ---------- Batched complaints ----------
+def build_batch_prompt(texts):
+    numbered = "\n".join(f"{i}. {json.dumps(text, ensure_ascii=False)}" for i, text in enumerate(texts, start=1))
+    return (
+        "You are an assistant that classifies customer complaint texts. Put each complaint into exactly one of "
+        "these categories: 'Supplier Issue', 'Logistics Issue', 'Customer Issue'.\n\n"
+        "Return only a JSON object mapping each complaint number to its category, "
+        "for example {\"1\": \"Supplier Issue\", \"2\": \"Customer Issue\"}.\n\n"
+        f"Complaints:\n{numbered}"
+    )
+
+
+def parse_batch_answer(answer, count):
+    """
+    Parse the JSON object returned for a batch of `count` complaints.
+    Returns the list of categories in input order, or None if the answer is malformed.
+    """
+    answer = answer.strip()
+    # Tolerate a fenced ```json block around the object
+    if answer.startswith("```"):
+        answer = answer.strip("`")
+        if answer.lower().startswith("json"):
+            answer = answer[4:]
+    try:
+        parsed = json.loads(answer)
+    except ValueError:
+        return None
+    if not isinstance(parsed, dict):
+        return None
+
+    categories = []
+    for i in range(1, count + 1):
+        value = parsed.get(str(i))
+        if not isinstance(value, str) or value.strip() not in CATEGORIES:
+            return None
+        categories.append(value.strip())
+    return categories
+
+
+# ---------- Compact prompts ----------
+COMPACT_INSTRUCTIONS = "Complaint codes: S=supplier/product fault, L=delivery/courier, C=other."
+
+
+def build_compact_messages(texts):
+    """
+    Chat messages asking for one category code per complaint and nothing else.
+    """
+    if len(texts) == 1:
+        instruction = " Reply with the code only."
+    else:
+        instruction = " One complaint per line. Reply with the codes in order, no separators."
+    lines = "\n".join(" ".join(str(text).split()) for text in texts)
+    return [
+        {"role": "system", "content": COMPACT_INSTRUCTIONS + instruction},
+        {"role": "user", "content": lines},
+    ]
+
+
+def parse_compact_answer(answer, count):
+    """
+    Strictly parse `count` category codes. Returns the categories in input order,
+    or None unless the answer is exactly that many codes (whitespace ignored).
+    """
+    codes = "".join(answer.split()).upper()
+    if len(codes) != count or any(code not in CATEGORY_CODES for code in codes):
+        return None
+    return [CATEGORY_CODES[code] for code in codes]
+
+
+def estimate_tokens(texts, mode=PROMPT_MODE):
+    """
+    Rough token count (about 4 characters per token) of one request for texts,
+    including the completion tokens.
+    """
+    texts = list(texts)
+    if mode == "compact":
+        prompt = "".join(m["content"] for m in build_compact_messages(texts))
+        return len(prompt) // 4 + len(texts)
+    prompt = build_prompt(texts[0]) if len(texts) == 1 else build_batch_prompt(texts)
+    return len(prompt) // 4 + 8 * len(texts)
+
+
+def classify_batch(texts, model=OPENAI_MODEL, mode=PROMPT_MODE, usage=None):
+    """
+    Classify several complaints with one ChatCompletion request.
+    Returns None when the batch answer is malformed; the caller decides how to
+    retry (llm_engine.run_batches sends the halves as requests of their own).
+    OpenAI errors are raised to the caller.
+    """
+    texts = list(texts)
+    if len(texts) == 1:
+        return [classify_text(texts[0], model, mode, usage)]
+
+    if mode == "compact":
+        # Each code is at least one character, so it never needs more than one token
+        answer = _chat(build_compact_messages(texts), model, usage, max_tokens=len(texts))
+        categories = parse_compact_answer(answer, len(texts))
+    else:
+        answer = _chat([{"role": "user", "content": build_batch_prompt(texts)}], model, usage)
+        categories = parse_batch_answer(answer, len(texts))
+    return categories
@@ -0,0 +1,143 @@
+# llm_engine.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from circuit_breaker import CircuitOpenError
+
+# ---------- Config ----------
+load_dotenv()
+OPENAI_MAX_WORKERS = int(os.getenv("OPENAI_MAX_WORKERS") or 8)
+OPENAI_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE") or 500)
+OPENAI_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE") or 200000)
+# How many seconds of quota may be spent in a single burst
+RATE_LIMIT_BURST_SECONDS = 5
+
+
+# ---------- Rate limiting ----------
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `per_minute` tokens per minute.
+    """
+
+    def __init__(self, per_minute, burst_seconds=RATE_LIMIT_BURST_SECONDS):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        """
+        Block until `amount` tokens are available, then take them.
+        Requests larger than the bucket are clamped to its capacity.
+        """
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimiter:
+    """
+    Combined requests-per-minute and tokens-per-minute limit.
+    A limit of 0 or None disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, tokens=0):
+        if self.requests:
+            self.requests.acquire(1)
+        if self.tokens and tokens:
+            self.tokens.acquire(tokens)
+
+
+# ---------- Concurrent execution ----------
+def run_concurrently(items, func, max_workers=OPENAI_MAX_WORKERS, limiter=None, cost=None, breaker=None):
+    """
+    Call func(item) for every item on a thread pool, at most `max_workers` at a time,
+    waiting on `limiter` before each call. `cost(item)` gives the token estimate.
+    With a `breaker`, calls go through it and are checked before waiting on the
+    limiter, so items are rejected with CircuitOpenError at once while it is open
+    (and wait for the probe while it is half-open).
+    Returns (results, errors): results in the original item order (None where func
+    raised) and a list of (index, exception) pairs for the failed items.
+    """
+    items = list(items)
+    results = [None] * len(items)
+    errors = []
+
+    def run(index):
+        if breaker is None:
+            if limiter is not None:
+                limiter.acquire(cost(items[index]) if cost else 0)
+            return func(items[index])
+        permit = breaker.allow_request()
+        if permit is None:
+            raise CircuitOpenError("OpenAI circuit breaker is open; skipping request")
+        if limiter is not None:
+            try:
+                limiter.acquire(cost(items[index]) if cost else 0)
+            except BaseException:
+                breaker.release(permit)
+                raise
+        return breaker.call_allowed(permit, func, items[index])
+
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as pool:
+        futures = [pool.submit(run, index) for index in range(len(items))]
+        for index, future in enumerate(futures):
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                errors.append((index, e))
+    return results, errors
+
+
+def split_in_half(batch):
+    """
+    The two halves of a list, or None when it has a single item.
+    """
+    if len(batch) < 2:
+        return None
+    middle = len(batch) // 2
+    return [batch[:middle], batch[middle:]]
+
+
+def run_batches(batches, func, max_workers=OPENAI_MAX_WORKERS, limiter=None, cost=None, breaker=None,
+                split=split_in_half):
+    """
+    run_concurrently for batch requests: func(batch) returns one result per
+    member, or None when the answer for the batch is unusable (e.g. malformed).
+    Unusable batches are split with `split` and sent again, so every retry is a
+    request of its own through the breaker and the rate limiter.
+    Returns (answered, errors): (batch, results) pairs covering every member not
+    in a failed request (results is None where no usable answer came back), and
+    (batch, exception) pairs for the requests that raised.
+    """
+    answered, errors = [], []
+    pending = list(batches)
+    while pending:
+        results, failed = run_concurrently(pending, func, max_workers, limiter, cost, breaker)
+        failed = dict(failed)
+        retry = []
+        for index, (batch, result) in enumerate(zip(pending, results)):
+            parts = split(batch) if result is None and index not in failed else None
+            if index in failed:
+                errors.append((batch, failed[index]))
+            elif parts:
+                retry += parts
+            else:
+                answered.append((batch, result))
+        pending = retry
+    return answered, errors
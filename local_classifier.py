@@ -0,0 +1,237 @@
+# local_classifier.py
+import argparse
+import os
+import re
+import time
+import zlib
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from ticket_store import TICKET_STORE, open_ticket_store
+
+# ---------- Config ----------
+load_dotenv()
+LOCAL_MODEL_FILE = os.getenv("LOCAL_MODEL_FILE", "local_model.npz")
+# Local predictions below this probability are treated as hard cases
+LOCAL_MIN_CONFIDENCE = float(os.getenv("LOCAL_MIN_CONFIDENCE") or 0.8)
+HASH_BUCKETS = 1 << 18
+
+
+# ---------- Hashed n-gram features ----------
+def text_features(text):
+    """
+    Feature strings for one message: word unigrams and bigrams plus character
+    trigrams of each word, so misspellings and Hinglish variants still overlap.
+    """
+    words = re.findall(r"\w+", str(text).lower())
+    features = ["bias"]
+    features.extend(f"w:{w}" for w in words)
+    features.extend(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+    for w in words:
+        padded = f"<{w}>"
+        features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return features
+
+
+def hash_features(messages, buckets=HASH_BUCKETS):
+    """
+    Turn a Series of messages into a CSR matrix (indptr, indices, values) over
+    `buckets` hashed feature columns, one L2-normalized row per message.
+    """
+    indptr, indices = [0], []
+    bucket_of = {}
+    for text in messages.fillna("").astype(str).tolist():
+        for feature in text_features(text):
+            bucket = bucket_of.get(feature)
+            if bucket is None:
+                bucket = bucket_of[feature] = zlib.crc32(feature.encode("utf-8")) % buckets
+            indices.append(bucket)
+        indptr.append(len(indices))
+    indptr = np.asarray(indptr, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int64)
+
+    lengths = np.diff(indptr)
+    values = np.repeat(1.0 / np.sqrt(lengths), lengths).astype(np.float32)
+    return indptr, indices, values
+
+
+# ---------- Linear model ----------
+class LocalClassifier:
+    """
+    Multinomial logistic regression over hashed n-gram features, in NumPy.
+    """
+
+    def __init__(self, classes, weights=None, buckets=HASH_BUCKETS):
+        self.classes = list(classes)
+        self.buckets = buckets
+        self.weights = weights if weights is not None else np.zeros((buckets, len(self.classes)), dtype=np.float32)
+
+    def _scores(self, indptr, indices, values):
+        contributions = self.weights[indices] * values[:, None]
+        return np.add.reduceat(contributions, indptr[:-1], axis=0)
+
+    def predict_proba(self, messages):
+        """
+        Class probabilities for a Series of messages, one row per message.
+        Repeated messages are featurized and scored once.
+        """
+        codes, uniques = pd.factorize(messages.fillna("").astype(str))
+        if len(uniques) == 0:
+            return np.zeros((0, len(self.classes)), dtype=np.float32)
+        scores = self._scores(*hash_features(pd.Series(uniques), self.buckets))
+        scores -= scores.max(axis=1, keepdims=True)
+        probabilities = np.exp(scores)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        return probabilities[codes]
+
+    def predict_series(self, messages):
+        """
+        Returns (categories, confidences) as Series aligned with the input index.
+        """
+        probabilities = self.predict_proba(messages)
+        best = probabilities.argmax(axis=1)
+        categories = pd.Series(np.asarray(self.classes, dtype=object)[best], index=messages.index, name=messages.name)
+        confidence = pd.Series(probabilities[np.arange(len(best)), best], index=messages.index, name="Confidence")
+        return categories, confidence
+
+    def fit(self, messages, labels, epochs=10, learning_rate=0.5, batch_size=256, seed=0):
+        """
+        Train with mini-batch SGD on softmax cross-entropy.
+        """
+        indptr, indices, values = hash_features(messages, self.buckets)
+        targets = pd.Categorical(labels, categories=self.classes).codes
+        rng = np.random.RandomState(seed)
+        for epoch in range(epochs):
+            rate = learning_rate / (1 + epoch)
+            order = rng.permutation(len(targets))
+            for start in range(0, len(order), batch_size):
+                rows = order[start:start + batch_size]
+                # Gather the CSR slices of this batch
+                lengths = indptr[rows + 1] - indptr[rows]
+                offsets = np.repeat(indptr[rows] - np.r_[0, np.cumsum(lengths)[:-1]], lengths) + np.arange(lengths.sum())
+                batch_indptr = np.r_[0, np.cumsum(lengths)]
+                batch_indices, batch_values = indices[offsets], values[offsets]
+
+                scores = self._scores(batch_indptr, batch_indices, batch_values)
+                scores -= scores.max(axis=1, keepdims=True)
+                gradient = np.exp(scores)
+                gradient /= gradient.sum(axis=1, keepdims=True)
+                gradient[np.arange(len(rows)), targets[rows]] -= 1.0
+                row_of_value = np.repeat(np.arange(len(rows)), lengths)
+                np.add.at(self.weights, batch_indices, -rate * batch_values[:, None] * gradient[row_of_value])
+        return self
+
+    def save(self, path=LOCAL_MODEL_FILE):
+        # np.savez appends .npz when missing, so write through a file handle
+        with open(path, "wb") as f:
+            np.savez(f, weights=self.weights, classes=np.asarray(self.classes), buckets=self.buckets)
+
+    @classmethod
+    def load(cls, path=LOCAL_MODEL_FILE):
+        with np.load(path) as data:
+            return cls([str(c) for c in data["classes"]], data["weights"], int(data["buckets"]))
+
+
+# ---------- Training data ----------
+def load_training_data(data_path, ticket_store=None, label_column="AI_Category"):
+    """
+    Read labelled complaints and fill in labels from the ticket history in
+    `ticket_store` (see ticket_store.open_ticket_store): a complaint that got a
+    per-complaint supplier ticket is labelled 'Supplier Issue'.
+    Rows without a usable label are dropped.
+    """
+    df = pd.read_csv(data_path)
+    if label_column not in df.columns:
+        df[label_column] = None
+    if ticket_store is not None:
+        tickets = ticket_store.all(["Complaint_ID", "Issue"])
+        ticketed = tickets.loc[tickets["Issue"].astype(str).str.startswith("Supplier Issue"), "Complaint_ID"].astype(str)
+        unlabelled = df[label_column].isna() | (df[label_column] == "Unknown")
+        df.loc[unlabelled & df["Complaint_ID"].astype(str).isin(set(ticketed)), label_column] = "Supplier Issue"
+    df = df[df[label_column].notna() & (df[label_column] != "Unknown")]
+    return df["Message"], df[label_column].astype(str)
+
+
+def confusion_matrix(expected, predicted):
+    """
+    Expected categories as rows, predicted categories as columns.
+    """
+    return pd.crosstab(
+        pd.Series(np.asarray(expected), name="Expected"), pd.Series(np.asarray(predicted), name="Predicted")
+    )
+
+
+def category_metrics(expected, predicted):
+    """
+    Precision, recall and F1 per category, as a DataFrame.
+    """
+    expected, predicted = np.asarray(expected), np.asarray(predicted)
+    records = []
+    for category in sorted(set(expected) | set(predicted)):
+        tp = int(((predicted == category) & (expected == category)).sum())
+        precision = tp / max(int((predicted == category).sum()), 1)
+        recall = tp / max(int((expected == category).sum()), 1)
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        records.append({
+            "Category": category, "Support": int((expected == category).sum()),
+            "Precision": round(precision, 3), "Recall": round(recall, 3), "F1": round(f1, 3),
+        })
+    return pd.DataFrame(records, columns=["Category", "Support", "Precision", "Recall", "F1"])
+
+
+def evaluation_report(expected, predicted, seconds):
+    """
+    Accuracy, per-category precision/recall and throughput as printable text.
+    """
+    expected, predicted = np.asarray(expected), np.asarray(predicted)
+    lines = [f"Rows: {len(expected)}  Accuracy: {(expected == predicted).mean():.3f}  "
+             f"Rows/sec: {len(expected) / seconds if seconds else float('inf'):,.0f}"]
+    for row in category_metrics(expected, predicted).itertuples(index=False):
+        lines.append(f"  {row.Category:<20} precision {row.Precision:.3f}  recall {row.Recall:.3f}")
+    return "\n".join(lines)
+
+
+# ---------- CLI ----------
+def main():
+    parser = argparse.ArgumentParser(description="Train or evaluate the local complaint classifier.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train = sub.add_parser("train", help="Train a model from labelled complaints and ticket history")
+    train.add_argument("--data", required=True, help="CSV with Complaint_ID, Message and the label column")
+    train.add_argument("--tickets", choices=["sqlite", "csv", "none"], default=TICKET_STORE,
+                       help="Ticket store whose history fills in missing labels")
+    train.add_argument("--label-column", default="AI_Category")
+    train.add_argument("--model", default=LOCAL_MODEL_FILE)
+    train.add_argument("--epochs", type=int, default=10)
+    train.add_argument("--holdout", type=float, default=0.1, help="Fraction of rows held out for evaluation")
+
+    evaluate = sub.add_parser("evaluate", help="Evaluate a trained model on labelled complaints")
+    evaluate.add_argument("--data", required=True)
+    evaluate.add_argument("--label-column", default="AI_Category")
+    evaluate.add_argument("--model", default=LOCAL_MODEL_FILE)
+
+    args = parser.parse_args()
+    if args.command == "train":
+        tickets = open_ticket_store(args.tickets) if args.tickets != "none" else None
+        messages, labels = load_training_data(args.data, tickets, args.label_column)
+        holdout = np.random.RandomState(0).rand(len(labels)) < args.holdout
+        model = LocalClassifier(sorted(labels.unique()))
+        model.fit(messages[~holdout], labels[~holdout], epochs=args.epochs)
+        model.save(args.model)
+        print(f"Trained on {int((~holdout).sum())} rows, saved to {args.model}")
+        if holdout.any():
+            start = time.perf_counter()
+            predicted, _ = model.predict_series(messages[holdout])
+            print(evaluation_report(labels[holdout], predicted, time.perf_counter() - start))
+    else:
+        messages, labels = load_training_data(args.data, None, args.label_column)
+        start = time.perf_counter()
+        model = LocalClassifier.load(args.model)
+        loaded = time.perf_counter()
+        predicted, _ = model.predict_series(messages)
+        print(f"Model loaded in {(loaded - start) * 1000:.1f} ms")
+        print(evaluation_report(labels, predicted, time.perf_counter() - loaded))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# model_router.py
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from keyword_classifier import get_matcher
+from llm_classifier import OPENAI_MODEL
+
+# ---------- Config ----------
+load_dotenv()
+# Routes are tried in order; a message takes the first route whose limits it fits.
+# A limit left out (or null) is not checked, so the last route should have none.
+# min_cluster_size catches template-like complaints: ones sent, near-verbatim,
+# by several customers (see near_duplicates.cluster_messages).
+DEFAULT_MODEL_ROUTES = [
+    {"name": "template", "model": OPENAI_MODEL, "min_cluster_size": 2},
+    {"name": "short", "model": OPENAI_MODEL, "max_chars": 160, "max_categories": 1},
+    {"name": "long", "model": os.getenv("OPENAI_STRONG_MODEL", "gpt-4o")},
+]
+MODEL_ROUTES = json.loads(os.getenv("OPENAI_MODEL_ROUTES") or "null") or DEFAULT_MODEL_ROUTES
+
+
+# ---------- Routing ----------
+class ModelRouter:
+    """
+    Picks an OpenAI model per complaint from its length, from how many
+    keyword categories it mentions (a rough multi-issue signal) and from how
+    many near-duplicates it has (a template-like signal). `cluster_sizes` maps
+    message text to its near-duplicate cluster size; texts missing from it
+    count as singletons.
+    """
+
+    def __init__(self, routes=MODEL_ROUTES, matcher=None, cluster_sizes=None):
+        self.routes = routes
+        self.matcher = matcher or get_matcher()
+        self.cluster_sizes = cluster_sizes or {}
+        self.models = {route["name"]: route["model"] for route in routes}
+
+    def route_series(self, messages):
+        """
+        Route name per message, as a Series aligned with the input index.
+        """
+        lengths = messages.fillna("").astype(str).str.len().to_numpy()
+        categories = self.matcher.category_counts(messages).to_numpy()
+        cluster_sizes = messages.map(self.cluster_sizes).fillna(1).to_numpy()
+        names = np.full(len(messages), self.routes[-1]["name"], dtype=object)
+        unrouted = np.ones(len(messages), dtype=bool)
+        for route in self.routes:
+            fits = unrouted.copy()
+            if route.get("max_chars") is not None:
+                fits &= lengths <= route["max_chars"]
+            if route.get("max_categories") is not None:
+                fits &= categories <= route["max_categories"]
+            if route.get("min_cluster_size") is not None:
+                fits &= cluster_sizes >= route["min_cluster_size"]
+            names[fits] = route["name"]
+            unrouted &= ~fits
+        return pd.Series(names, index=messages.index, name="Route")
+
+
+class RouteStats:
+    """
+    Thread-safe per-route counts of complaints, requests and request latency.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = {}
+        self.latencies = {}
+
+    def add_rows(self, route, count):
+        with self.lock:
+            self.rows[route] = self.rows.get(route, 0) + count
+
+    def add_request(self, route, seconds):
+        with self.lock:
+            self.latencies.setdefault(route, []).append(seconds)
+
+    def summary(self):
+        """
+        One row per route: complaints, requests and p50/p95 latency in ms.
+        """
+        records = []
+        for route in sorted(set(self.rows) | set(self.latencies)):
+            latencies = self.latencies.get(route, [])
+            p50, p95 = np.percentile(latencies, [50, 95]) * 1000 if latencies else (0.0, 0.0)
+            records.append({
+                "Route": route, "Complaints": self.rows.get(route, 0), "Requests": len(latencies),
+                "p50_ms": round(p50, 1), "p95_ms": round(p95, 1),
+            })
+        return pd.DataFrame(records, columns=["Route", "Complaints", "Requests", "p50_ms", "p95_ms"])
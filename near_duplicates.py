@@ -0,0 +1,150 @@
+# near_duplicates.py
+import os
+import re
+import zlib
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from supplier_mentions import SupplierAutomaton, load_known_suppliers, supplier_tokens
+
+# ---------- Config ----------
+load_dotenv()
+# Short complaints that differ in one word ("late" / "not late") still score around 0.7-0.8
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD") or 0.9)
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+
+# Universal hashes (a*x + b) mod p with p = 2**31 - 1; the product stays below 2**62
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.RandomState(20240601)
+_HASH_A = _rng.randint(1, (1 << 31) - 1, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+_HASH_B = _rng.randint(0, (1 << 31) - 1, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+
+
+# ---------- Normalization ----------
+def normalize_for_dedup(message, supplier="", automaton=None):
+    """
+    Lowercase the message and mask the parts that vary between otherwise identical
+    complaints: the row's own supplier name, any supplier name known to
+    `automaton` (a SupplierAutomaton) and any numbers (order IDs, amounts).
+    """
+    text = str(message).lower()
+    supplier = str(supplier or "").strip().lower()
+    if supplier:
+        text = text.replace(supplier, " supplier ")
+    if automaton is not None:
+        tokens = list(supplier_tokens(text))
+        masked = [False] * len(tokens)
+        for start, end, _ in automaton.find_all(tokens):
+            masked[start:end] = [True] * (end - start)
+        # Each run of masked tokens becomes a single placeholder
+        text = " ".join(
+            "supplier" if masked[i] else token
+            for i, token in enumerate(tokens) if not (masked[i] and i and masked[i - 1])
+        )
+    text = re.sub(r"\d+", " 0 ", text)
+    return " ".join(re.findall(r"\w+", text))
+
+
+def shingles(text):
+    """
+    Word unigrams and bigrams of a normalized message.
+    """
+    words = text.split()
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+# ---------- MinHash ----------
+def minhash_signatures(texts):
+    """
+    MinHash signatures for a list of normalized texts, computed in bulk.
+    Returns a (len(texts), MINHASH_PERMUTATIONS) uint64 array.
+    """
+    grams, counts = [], []
+    for text in texts:
+        text_grams = shingles(text) or {""}
+        grams.extend(text_grams)
+        counts.append(len(text_grams))
+    # Hash each distinct shingle once; complaint vocabularies repeat heavily
+    codes, distinct = pd.factorize(pd.Series(grams, dtype=object))
+    distinct_hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in distinct), dtype=np.uint64, count=len(distinct))
+    hashes = distinct_hashes[codes] % _MERSENNE_PRIME
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+
+    signatures = np.empty((len(texts), MINHASH_PERMUTATIONS), dtype=np.uint64)
+    for p in range(MINHASH_PERMUTATIONS):
+        permuted = (_HASH_A[p] * hashes + _HASH_B[p]) % _MERSENNE_PRIME
+        signatures[:, p] = np.minimum.reduceat(permuted, starts)
+    return signatures
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+# ---------- Clustering ----------
+def cluster_messages(messages, suppliers=None, threshold=NEAR_DUPLICATE_THRESHOLD, matcher=None):
+    """
+    Group near-identical complaints. Every known supplier name (from `suppliers`
+    and the known-suppliers file) is masked first. Messages that are equal after
+    normalization share a cluster outright; the rest are matched by MinHash LSH.
+    A message joins a cluster only when its estimated Jaccard similarity to the
+    cluster's first message is at least `threshold`, so merges never chain, and,
+    with a keyword `matcher`, only when both have the same keyword labels.
+    Returns (cluster_ids, cluster_sizes) as Series aligned with the input index.
+    The cluster ID is the position of the cluster's first row.
+    """
+    if suppliers is None:
+        suppliers = pd.Series("", index=messages.index)
+    automaton = SupplierAutomaton(load_known_suppliers(suppliers))
+    texts = messages.fillna("").astype(str).tolist()
+    normalized_pairs = {}
+    normalized = []
+    for m, s in zip(texts, suppliers.fillna("").astype(str).tolist()):
+        if (m, s) not in normalized_pairs:
+            normalized_pairs[(m, s)] = normalize_for_dedup(m, s, automaton)
+        normalized.append(normalized_pairs[(m, s)])
+    row_labels = [""] * len(texts)
+    if matcher is not None:
+        # Messages with different keyword labels ("late" / "not late") are never merged
+        row_labels = matcher.analyze_series(pd.Series(texts, dtype=object))["AI_Labels"].astype(str).tolist()
+    codes, unique_keys = pd.factorize(pd.Series(list(zip(normalized, row_labels)), dtype=object))
+    uniques = [key[0] for key in unique_keys]
+    labels = [key[1] for key in unique_keys]
+    parent = np.arange(len(uniques))
+    size = np.ones(len(uniques), dtype=np.int64)
+
+    if threshold < 1.0 and len(uniques) > 1:
+        signatures = minhash_signatures(list(uniques))
+        rows = MINHASH_PERMUTATIONS // LSH_BANDS
+        for band in range(LSH_BANDS):
+            block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+            _, bucket = np.unique(block.view(f"V{block.dtype.itemsize * rows}").ravel(), return_inverse=True)
+            order = np.argsort(bucket, kind="stable")
+            sorted_buckets = bucket[order]
+            starts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+            # Verify each bucket member against the bucket's first member only
+            heads = order[np.repeat(starts, np.diff(np.r_[starts, len(order)]))]
+            candidates = heads != order
+            heads, members = heads[candidates], order[candidates]
+            similarity = (signatures[members] == signatures[heads]).mean(axis=1)
+            for head, member in zip(heads[similarity >= threshold], members[similarity >= threshold]):
+                root, other = sorted((_find(parent, head), _find(parent, member)))
+                # Only a lone message can join, and only if it is close to the cluster's
+                # first message, whose label every member inherits
+                if root == other or size[other] != 1 or labels[root] != labels[other]:
+                    continue
+                if (signatures[root] == signatures[other]).mean() >= threshold:
+                    parent[other] = root
+                    size[root] += 1
+
+    roots = np.array([_find(parent, i) for i in range(len(uniques))], dtype=np.int64)
+    # Label each cluster by the position of its first row in the input
+    row_roots = roots[codes]
+    first_position = pd.Series(np.arange(len(row_roots))).groupby(row_roots).transform("min").to_numpy()
+    cluster_ids = pd.Series(first_position, index=messages.index, name="Cluster_ID")
+    cluster_sizes = cluster_ids.map(cluster_ids.value_counts()).rename("Cluster_Size")
+    return cluster_ids, cluster_sizes
@@ -0,0 +1,130 @@
+# supplier_mentions.py
+import os
+import re
+from collections import deque
+import pandas as pd
+from dotenv import load_dotenv
+from supplier_resolution import normalize_supplier
+
+# ---------- Config ----------
+load_dotenv()
+# Optional extra supplier names, one per line, on top of the upload's Supplier column
+KNOWN_SUPPLIERS_FILE = os.getenv("KNOWN_SUPPLIERS_FILE", "known_suppliers.txt")
+TOKEN_PATTERN = r"[^\W_]+"
+
+
+def supplier_tokens(name):
+    """
+    Lowercased word tokens of a supplier name or message, ignoring punctuation and spacing.
+    """
+    return tuple(re.findall(TOKEN_PATTERN, str(name).lower()))
+
+
+def load_known_suppliers(suppliers=(), path=KNOWN_SUPPLIERS_FILE):
+    """
+    Distinct non-empty supplier names from `suppliers` plus the known-suppliers file, if any.
+    """
+    names = [str(s) for s in pd.Series(suppliers, dtype=object).dropna().unique()]
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            names += [line.strip() for line in f if line.strip()]
+    return list(dict.fromkeys(name for name in names if supplier_tokens(name)))
+
+
+# ---------- Automaton ----------
+class SupplierAutomaton:
+    """
+    Aho-Corasick automaton over word tokens of the known supplier names.
+    One left-to-right walk over a message's tokens finds every supplier
+    mentioned in it, however many suppliers are known.
+    """
+
+    def __init__(self, suppliers):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for name in suppliers:
+            tokens = supplier_tokens(name)
+            if not tokens:
+                continue
+            node = 0
+            for token in tokens:
+                if token not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[node][token] = len(self.goto) - 1
+                node = self.goto[node][token]
+            # Names that normalize to the same tokens keep the first spelling seen
+            if not self.output[node]:
+                self.output[node].append((len(tokens), name))
+        self.first_tokens = set(self.goto[0])
+
+        # Breadth-first failure links; each node also reports the names its failure chain ends in
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self.goto[node].items():
+                queue.append(child)
+                if node:
+                    fallback = self.fail[node]
+                    while fallback and token not in self.goto[fallback]:
+                        fallback = self.fail[fallback]
+                    self.fail[child] = self.goto[fallback].get(token, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find_all(self, tokens):
+        """
+        All (start, end, name) supplier mentions in a token sequence.
+        """
+        matches = []
+        node = 0
+        for position, token in enumerate(tokens):
+            while node and token not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(token, 0)
+            for length, name in self.output[node]:
+                matches.append((position + 1 - length, position + 1, name))
+        return matches
+
+    def first_mention(self, text):
+        """
+        Leftmost (and, among those, longest) supplier mentioned in text, or None.
+        """
+        matches = self.find_all(supplier_tokens(text))
+        if not matches:
+            return None
+        return min(matches, key=lambda m: (m[0], -(m[1] - m[0])))[2]
+
+    def extract_series(self, messages):
+        """
+        First supplier mentioned in each message, as a Series aligned with the
+        input index (None where no known supplier is mentioned).
+        """
+        codes, uniques = pd.factorize(messages.fillna("").astype(str))
+        mentions = pd.Series([None] * len(uniques), dtype=object)
+        if self.first_tokens and len(uniques):
+            # Only texts containing the first word of some supplier name are walked
+            lowered = pd.Series(uniques).str.lower()
+            starts = "|".join(re.escape(t) for t in sorted(self.first_tokens, key=len, reverse=True))
+            candidates = lowered.str.contains(rf"\b(?:{starts})\b", regex=True, na=False).to_numpy(dtype=bool)
+            mentions[candidates] = [self.first_mention(text) for text in lowered[candidates]]
+        return pd.Series(mentions.to_numpy()[codes], index=messages.index, name="Mentioned_Supplier")
+
+
+def flag_supplier_mismatches(df, automaton=None, message_column="Message", supplier_column="Supplier"):
+    """
+    Returns (mentions, mismatches) Series aligned with df: the supplier named in
+    each message, and True where that differs from the row's Supplier column
+    (after normalizing case, punctuation and legal-form words).
+    The automaton defaults to one built from the known suppliers.
+    """
+    automaton = automaton or SupplierAutomaton(load_known_suppliers(df[supplier_column]))
+    mentions = automaton.extract_series(df[message_column])
+    normalized = {}
+    for value in pd.concat([mentions.dropna(), df[supplier_column].dropna()]).unique():
+        normalized[value] = normalize_supplier(value)
+    mentioned = mentions.map(normalized)
+    stated = df[supplier_column].map(normalized)
+    mismatches = mentions.notna() & (mentioned != stated)
+    return mentions, mismatches.rename("Supplier_Mismatch")
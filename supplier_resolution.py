@@ -0,0 +1,156 @@
+# supplier_resolution.py
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from dotenv import load_dotenv
+
+# ---------- Config ----------
+load_dotenv()
+SUPPLIER_REGISTRY_FILE = os.getenv("SUPPLIER_REGISTRY_FILE", "supplier_registry.db")
+# Trigram Dice similarity needed to treat two supplier names as the same supplier
+SUPPLIER_MATCH_THRESHOLD = float(os.getenv("SUPPLIER_MATCH_THRESHOLD") or 0.8)
+# Blocking keys shared by more suppliers than this (e.g. "traders") are too common to narrow anything
+SUPPLIER_BLOCK_MAX = 500
+LEGAL_SUFFIXES = {"pvt", "private", "ltd", "limited", "llp", "inc", "co", "company", "corp", "corporation", "the"}
+
+
+def normalize_supplier(name):
+    """
+    Lowercased tokens of a supplier name without punctuation or legal-form words,
+    so "XYZ Traders ", "xyz traders pvt. ltd." and "XYZ TRADERS" all become "xyz traders".
+    """
+    tokens = re.findall(r"[^\W_]+", str(name).lower())
+    kept = [t for t in tokens if t not in LEGAL_SUFFIXES]
+    return " ".join(kept or tokens)
+
+
+def _trigrams(normalized):
+    padded = f" {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def name_similarity(a_grams, b_grams):
+    """
+    Dice coefficient of two trigram sets.
+    """
+    if not a_grams or not b_grams:
+        return 0.0
+    return 2 * len(a_grams & b_grams) / (len(a_grams) + len(b_grams))
+
+
+def blocking_keys(normalized):
+    """
+    Keys a name is filed under: each word of 3+ letters and the first four
+    letters of the name. Only names sharing a key are ever compared.
+    """
+    keys = {f"w:{token}" for token in normalized.split() if len(token) >= 3}
+    keys.add(f"p:{normalized.replace(' ', '')[:4]}")
+    return keys
+
+
+def supplier_id(normalized):
+    return "SUP-" + hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:10]
+
+
+# ---------- Registry ----------
+class SupplierRegistry:
+    """
+    Maps raw supplier names to canonical supplier IDs. Names seen before are
+    answered from the persisted alias table; new names are matched against the
+    canonical suppliers sharing a blocking key, and become new canonical
+    suppliers when nothing is similar enough.
+    """
+
+    def __init__(self, path=SUPPLIER_REGISTRY_FILE, threshold=SUPPLIER_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.stats = {"cached": 0, "exact": 0, "similar": 0, "new": 0}
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS suppliers ("
+            "supplier_id TEXT PRIMARY KEY, name TEXT NOT NULL, normalized TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS supplier_aliases (alias TEXT PRIMARY KEY, supplier_id TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+        self.names = {}
+        self.by_normalized = {}
+        self.grams = {}
+        self.blocks = {}
+        for sid, name, normalized in self.conn.execute("SELECT supplier_id, name, normalized FROM suppliers"):
+            self._add_supplier(sid, name, normalized)
+        self.aliases = dict(self.conn.execute("SELECT alias, supplier_id FROM supplier_aliases"))
+
+    def _add_supplier(self, sid, name, normalized):
+        self.names[sid] = name
+        self.by_normalized[normalized] = sid
+        self.grams[sid] = _trigrams(normalized)
+        for key in blocking_keys(normalized):
+            self.blocks.setdefault(key, []).append(sid)
+
+    def _match(self, normalized):
+        """
+        Most similar canonical supplier sharing a blocking key, if similar enough.
+        """
+        grams = _trigrams(normalized)
+        candidates = set()
+        for key in blocking_keys(normalized):
+            block = self.blocks.get(key, ())
+            if len(block) <= SUPPLIER_BLOCK_MAX:
+                candidates.update(block)
+        best, best_score = None, self.threshold
+        for sid in candidates:
+            score = name_similarity(grams, self.grams[sid])
+            if score >= best_score:
+                best, best_score = sid, score
+        return best
+
+    def resolve(self, suppliers):
+        """
+        Canonical IDs and names for a Series of raw supplier names.
+        Returns (ids, names) as Series aligned with the input index; blank names stay missing.
+        """
+        raw = suppliers.fillna("").astype(str)
+        # Most frequent spellings first, so they become the canonical name
+        distinct = raw.value_counts(sort=True).index.tolist()
+        new_aliases, new_suppliers = [], []
+        with self.lock:
+            for alias in distinct:
+                if alias in self.aliases:
+                    self.stats["cached"] += 1
+                    continue
+                normalized = normalize_supplier(alias)
+                if not normalized:
+                    continue
+                sid = self.by_normalized.get(normalized)
+                if sid is not None:
+                    self.stats["exact"] += 1
+                else:
+                    sid = self._match(normalized)
+                    if sid is not None:
+                        self.stats["similar"] += 1
+                    else:
+                        sid = supplier_id(normalized)
+                        name = alias.strip()
+                        self._add_supplier(sid, name, normalized)
+                        new_suppliers.append((sid, name, normalized))
+                        self.stats["new"] += 1
+                self.aliases[alias] = sid
+                new_aliases.append((alias, sid))
+            if new_aliases:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO suppliers (supplier_id, name, normalized) VALUES (?, ?, ?)", new_suppliers
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO supplier_aliases (alias, supplier_id) VALUES (?, ?)", new_aliases
+                )
+                self.conn.commit()
+            ids = raw.map(self.aliases)
+            names = ids.map(self.names)
+        return ids.rename("Supplier_ID"), names.rename("Canonical_Supplier")
@@ -0,0 +1,65 @@
+# ticket_ids.py
+import itertools
+import os
+import time
+
+# Ticket IDs are "T" + 23 Crockford base32 characters encoding, from the most
+# significant bits down:
+#   48 bits  milliseconds since the Unix epoch  -> IDs sort by creation time
+#   40 bits  random worker ID drawn once per process (and again after a fork)
+#   24 bits  per-process sequence number
+# No two threads share a sequence number and no two processes share a worker ID
+# (up to a ~1e-12 chance per pair), so IDs are unique without any lock or coordination.
+
+# ---------- Config ----------
+TIMESTAMP_BITS = 48
+WORKER_BITS = 40
+SEQUENCE_BITS = 24
+ID_PREFIX = "T"
+CROCKFORD_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ID_CHARS = -(-(TIMESTAMP_BITS + WORKER_BITS + SEQUENCE_BITS) // 5)
+
+
+def _new_worker():
+    return int.from_bytes(os.urandom(WORKER_BITS // 8), "big")
+
+
+class TicketIdGenerator:
+    """
+    k-sortable ticket IDs in the style of ULID/Snowflake. `next()` is safe to
+    call from any number of threads: the sequence is an itertools.count, whose
+    increment is atomic, so there is no lock to contend on.
+    """
+
+    def __init__(self, worker=None):
+        self.worker = _new_worker() if worker is None else worker & ((1 << WORKER_BITS) - 1)
+        self.sequence = itertools.count()
+
+    def reseed(self):
+        """
+        Fresh worker ID and sequence, for a child process after fork.
+        """
+        self.worker = _new_worker()
+        self.sequence = itertools.count()
+
+    def next_int(self):
+        millis = time.time_ns() // 1_000_000 & ((1 << TIMESTAMP_BITS) - 1)
+        sequence = next(self.sequence) & ((1 << SEQUENCE_BITS) - 1)
+        return (millis << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker << SEQUENCE_BITS) | sequence
+
+    def next(self):
+        value = self.next_int()
+        chars = []
+        for _ in range(ID_CHARS):
+            chars.append(CROCKFORD_ALPHABET[value & 31])
+            value >>= 5
+        return ID_PREFIX + "".join(reversed(chars))
+
+
+TICKET_IDS = TicketIdGenerator()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=TICKET_IDS.reseed)
+
+
+def new_ticket_id():
+    return TICKET_IDS.next()
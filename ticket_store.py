@@ -0,0 +1,504 @@
+# ticket_store.py
+import argparse
+import csv
+import hashlib
+import io
+import itertools
+import math
+import mmap
+import os
+import sqlite3
+import threading
+import pandas as pd
+from dotenv import load_dotenv
+
+# ---------- Config ----------
+load_dotenv()
+TICKET_COLUMNS = ["Ticket_ID", "Complaint_ID", "Supplier", "Product", "Order_ID", "Issue", "Created_At", "Status", "Notes"]
+TICKETS_FILE = os.getenv("TICKETS_FILE", "tickets.csv")
+TICKETS_DB_FILE = os.getenv("TICKETS_DB_FILE", "tickets.db")
+# "sqlite" keeps tickets in TICKETS_DB_FILE; "csv" keeps the original tickets.csv log
+TICKET_STORE = os.getenv("TICKET_STORE", "sqlite").lower()
+# Idempotency keys of tickets kept in the CSV log (the SQLite store keeps them in TICKETS_DB_FILE)
+TICKET_KEYS_DB_FILE = os.getenv("TICKET_KEYS_DB_FILE", "ticket_keys.db")
+IMPORT_CHUNK_ROWS = 100000
+INDEXED_COLUMNS = ["Ticket_ID", "Supplier", "Status", "Created_At"]
+BLOOM_MIN_CAPACITY = 100000
+BLOOM_ERROR_RATE = 0.01
+# Issue prefix -> ticket kind, to derive the keys of tickets saved before keys existed
+ISSUE_KINDS = [("Supplier Issue detected", "complaint"), ("Aggregate alert", "aggregate")]
+# PRAGMA user_version of a tickets database whose existing tickets have keys
+KEYED_DB_VERSION = 1
+
+
+def ticket_row(ticket):
+    return [ticket.get(column, "") for column in TICKET_COLUMNS]
+
+
+def ticket_key(complaint_id, kind):
+    """
+    Idempotency key of a ticket: at most one ticket of each kind ("complaint",
+    "aggregate") is created per complaint. None when the complaint has no ID.
+    """
+    if complaint_id is None or pd.isna(complaint_id) or str(complaint_id).strip() == "":
+        return None
+    return (str(complaint_id).strip(), kind)
+
+
+def issue_kind(issue):
+    """
+    Ticket kind of a saved ticket's Issue text, or None for a manual ticket.
+    """
+    for prefix, kind in ISSUE_KINDS:
+        if str(issue).startswith(prefix):
+            return kind
+    return None
+
+
+# ---------- Idempotency index ----------
+class BloomFilter:
+    """
+    Bit array answering "definitely not added" or "maybe added", with
+    `error_rate` false positives at `capacity` keys.
+    """
+
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class TicketKeyIndex:
+    """
+    Persistent set of ticket idempotency keys in a `ticket_keys` table, with an
+    in-memory Bloom filter in front: a key the filter has never seen is new
+    without a disk lookup. The table is authoritative; `claim` is what
+    decides, inside the caller's transaction, whether a ticket gets saved.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS ticket_keys ("
+            "complaint_id TEXT NOT NULL, kind TEXT NOT NULL, ticket_id TEXT NOT NULL, "
+            "PRIMARY KEY (complaint_id, kind)) WITHOUT ROWID"
+        )
+        self.conn.commit()
+        self._load()
+
+    @staticmethod
+    def _bloom_key(key):
+        return f"{key[0]}\x1f{key[1]}"
+
+    def _load(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM ticket_keys").fetchone()[0]
+        self.bloom = BloomFilter(max(BLOOM_MIN_CAPACITY, 2 * count))
+        for key in self.conn.execute("SELECT complaint_id, kind FROM ticket_keys"):
+            self.bloom.add(self._bloom_key(key))
+
+    def __contains__(self, key):
+        if self._bloom_key(key) not in self.bloom:
+            return False
+        return self.conn.execute(
+            "SELECT 1 FROM ticket_keys WHERE complaint_id = ? AND kind = ?", key
+        ).fetchone() is not None
+
+    def claim(self, key, ticket_id):
+        """
+        Record the key for ticket_id in the current transaction. False when the
+        key already belongs to another ticket (possibly created by another process).
+        """
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO ticket_keys (complaint_id, kind, ticket_id) VALUES (?, ?, ?)", (*key, ticket_id)
+        )
+        return cursor.rowcount == 1
+
+    def backfill(self, tickets):
+        """
+        Claim, in the current transaction, the keys of (Ticket_ID, Complaint_ID,
+        Issue) rows saved without one; the earliest ticket of a key keeps it.
+        Returns the keys, to `remember` once committed.
+        """
+        rows = []
+        for ticket_id, complaint_id, issue in tickets:
+            kind = issue_kind(issue)
+            key = ticket_key(complaint_id, kind) if kind else None
+            if key is not None:
+                rows.append((*key, ticket_id))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO ticket_keys (complaint_id, kind, ticket_id) VALUES (?, ?, ?)", rows
+        )
+        return [row[:2] for row in rows]
+
+    def remember(self, keys):
+        """
+        Add committed keys to the Bloom filter, rebuilding it once it outgrows its capacity.
+        """
+        for key in keys:
+            self.bloom.add(self._bloom_key(key))
+        if self.bloom.count > self.bloom.capacity:
+            self._load()
+
+
+def _claim_all(key_index, tickets, keys):
+    """
+    Tickets whose key (if any) is newly claimed, and the claimed keys.
+    """
+    saved, claimed = [], []
+    for ticket, key in zip(tickets, keys or [None] * len(tickets)):
+        if key is None:
+            saved.append(ticket)
+        elif key_index.claim(key, ticket["Ticket_ID"]):
+            saved.append(ticket)
+            claimed.append(key)
+    return saved, claimed
+
+
+# ---------- CSV log ----------
+class CSVTicketStore:
+    """
+    The original append-only tickets.csv log. Idempotency keys live in a
+    separate SQLite file next to it; rows appended without a key (history
+    from before keys existed) get theirs when the store is opened.
+    """
+
+    def __init__(self, path=TICKETS_FILE, keys_path=TICKET_KEYS_DB_FILE):
+        self.path = path
+        self.location = path
+        self.lock = threading.Lock()
+        if not os.path.exists(path):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerow(TICKET_COLUMNS)
+        self.key_index = TicketKeyIndex(sqlite3.connect(keys_path, check_same_thread=False))
+        self._backfill_keys()
+
+    def _backfill_keys(self):
+        """
+        Claim keys for the rows after the offset scanned last time, and move the
+        offset to the end of the last complete row, in one transaction.
+        """
+        conn = self.key_index.conn
+        conn.execute("CREATE TABLE IF NOT EXISTS ticket_key_scans (source TEXT PRIMARY KEY, offset INTEGER NOT NULL)")
+        source = os.path.abspath(self.path)
+        scanned = conn.execute("SELECT offset FROM ticket_key_scans WHERE source = ?", (source,)).fetchone()
+        with self.lock, open(self.path, "rb") as f:
+            header = next(csv.reader([f.readline().decode("utf-8")]), [])
+            start = max(scanned[0] if scanned else 0, f.tell())
+            f.seek(start)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        positions = [header.index(column) if column in header else None for column in ("Ticket_ID", "Complaint_ID", "Issue")]
+        rows = (
+            [row[p] if p is not None and p < len(row) else "" for p in positions]
+            for row in csv.reader(io.StringIO(data[:end].decode("utf-8"), newline=""))
+        )
+        try:
+            keys = self.key_index.backfill(rows)
+            conn.execute("INSERT OR REPLACE INTO ticket_key_scans (source, offset) VALUES (?, ?)", (source, start + end))
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        self.key_index.remember(keys)
+
+    def has_key(self, key):
+        with self.lock:
+            return key in self.key_index
+
+    def add(self, ticket, key=None):
+        """
+        Save one ticket; None when its key was already used.
+        """
+        saved = self.add_many([ticket], [key])
+        return saved[0] if saved else None
+
+    def add_many(self, tickets, keys=None):
+        """
+        Append tickets with one open, one writerows and one fsync, skipping
+        those whose key was already used. Returns the tickets saved.
+        """
+        if not tickets:
+            return []
+        with self.lock:
+            saved, claimed = _claim_all(self.key_index, tickets, keys)
+            try:
+                if saved:
+                    with open(self.path, "a", newline="", encoding="utf-8") as f:
+                        csv.writer(f).writerows(ticket_row(ticket) for ticket in saved)
+                        f.flush()
+                        os.fsync(f.fileno())
+            except Exception:
+                self.key_index.conn.rollback()
+                raise
+            # Keys are committed only once the rows are on disk
+            self.key_index.conn.commit()
+            self.key_index.remember(claimed)
+        return saved
+
+    def latest(self, n=200):
+        """
+        The n most recently created tickets, newest first. The log is append-only,
+        so these are its last n rows: the file is memory-mapped and scanned
+        backwards for line breaks, and only that tail is parsed, so the cost
+        depends on n rather than on the length of the ticket history.
+        """
+        with self.lock, open(self.path, "rb") as f:
+            header = next(csv.reader([f.readline().decode("utf-8")]), [])
+            body_start = f.tell()
+            rows = []
+            if n > 0 and os.fstat(f.fileno()).st_size > body_start:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    rows = _tail_rows(data, body_start, n, len(header))
+        positions = [header.index(column) if column in header else None for column in TICKET_COLUMNS]
+        tickets = pd.DataFrame(
+            [[row[p] if p is not None else "" for p in positions] for row in reversed(rows)], columns=TICKET_COLUMNS
+        )
+        return tickets.sort_values("Created_At", ascending=False, kind="stable").reset_index(drop=True)
+
+    def all(self, columns=TICKET_COLUMNS):
+        """
+        Every ticket in the log, as a DataFrame of strings with the given columns.
+        """
+        with self.lock:
+            tickets = pd.read_csv(self.path, dtype=str, keep_default_na=False)
+        for column in columns:
+            if column not in tickets.columns:
+                tickets[column] = ""
+        return tickets[list(columns)]
+
+
+def _tail_rows(data, body_start, n, width):
+    """
+    The last n complete CSV rows of a mapped file. A row only counts once its
+    line break is written, so a row being appended by another process is left
+    out. Quoted fields may contain line breaks, so when the tail does not parse
+    into rows of `width` fields the window is widened and parsed again.
+    """
+    end = data.rfind(b"\n", body_start) + 1
+    lines = n
+    while True:
+        start = end - 1
+        for _ in range(lines):
+            start = data.rfind(b"\n", body_start, start)
+            if start < 0:
+                break
+        start = body_start if start < 0 else start + 1
+        rows = list(csv.reader(io.StringIO(data[start:end].decode("utf-8"), newline="")))
+        if start == body_start:
+            return [row for row in rows if len(row) == width][-n:]
+        if len(rows) >= n and all(len(row) == width for row in rows):
+            return rows[-n:]
+        lines *= 2
+
+
+# ---------- SQLite store ----------
+class SQLiteTicketStore:
+    """
+    Tickets in a SQLite table (WAL mode) indexed on Supplier, Status and
+    Created_At, so the latest-tickets view and per-supplier or per-status
+    lookups read a handful of index pages instead of the whole history.
+    Tickets saved before idempotency keys existed, and imported ones, get
+    their keys from their Complaint_ID and Issue.
+    """
+
+    def __init__(self, path=TICKETS_DB_FILE):
+        self.location = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # Ticket_ID is not unique: imported CSV history has IDs that collided within a millisecond
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tickets (" + ", ".join(f"{column} TEXT" for column in TICKET_COLUMNS) + ")"
+        )
+        self._create_indexes()
+        self.conn.execute("CREATE TABLE IF NOT EXISTS ticket_imports (source TEXT PRIMARY KEY, rows INTEGER NOT NULL)")
+        self.conn.commit()
+        self.key_index = TicketKeyIndex(self.conn)
+        self.insert_sql = (
+            f"INSERT INTO tickets ({', '.join(TICKET_COLUMNS)}) VALUES ({', '.join('?' * len(TICKET_COLUMNS))})"
+        )
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < KEYED_DB_VERSION:
+            keys = self._backfill_keys()
+            self.conn.execute(f"PRAGMA user_version = {KEYED_DB_VERSION}")
+            self.conn.commit()
+            self.key_index.remember(keys)
+
+    def _create_indexes(self):
+        for column in INDEXED_COLUMNS:
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_tickets_{column.lower()} ON tickets({column})")
+
+    def _backfill_keys(self, after_rowid=0):
+        """
+        Claim keys, in the current transaction, for the tickets after after_rowid.
+        """
+        return self.key_index.backfill(self.conn.execute(
+            "SELECT Ticket_ID, Complaint_ID, Issue FROM tickets WHERE rowid > ? ORDER BY rowid", (after_rowid,)
+        ).fetchall())
+
+    def has_key(self, key):
+        with self.lock:
+            return key in self.key_index
+
+    def add(self, ticket, key=None):
+        """
+        Save one ticket; None when its key was already used.
+        """
+        saved = self.add_many([ticket], [key])
+        return saved[0] if saved else None
+
+    def add_many(self, tickets, keys=None):
+        """
+        Insert tickets and their keys in a single transaction, skipping those
+        whose key was already used. Returns the tickets saved.
+        """
+        if not tickets:
+            return []
+        with self.lock:
+            try:
+                saved, claimed = _claim_all(self.key_index, tickets, keys)
+                self.conn.executemany(self.insert_sql, [ticket_row(ticket) for ticket in saved])
+            except Exception:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+            self.key_index.remember(claimed)
+        return saved
+
+    def latest(self, n=200):
+        """
+        The n most recently created tickets, newest first, read through the Created_At index.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(TICKET_COLUMNS)} FROM tickets ORDER BY Created_At DESC, rowid DESC LIMIT ?", (n,)
+            ).fetchall()
+        return pd.DataFrame(rows, columns=TICKET_COLUMNS)
+
+    def all(self, columns=TICKET_COLUMNS):
+        """
+        Every ticket in the store, as a DataFrame with the given columns.
+        """
+        columns = [column for column in columns if column in TICKET_COLUMNS]
+        with self.lock:
+            rows = self.conn.execute(f"SELECT {', '.join(columns)} FROM tickets ORDER BY rowid").fetchall()
+        return pd.DataFrame(rows, columns=columns)
+
+    def import_csv(self, csv_path=TICKETS_FILE):
+        """
+        One-time import of a tickets.csv log, with the idempotency keys of its
+        tickets. A source that was imported before is skipped. Returns the
+        number of rows imported.
+        """
+        source = os.path.abspath(csv_path)
+        if not os.path.exists(csv_path):
+            return 0
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM ticket_imports WHERE source = ?", (source,)).fetchone():
+                return 0
+            imported = 0
+            last_rowid = self.conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM tickets").fetchone()[0]
+            # Into an empty table it is faster to build the indexes once after loading
+            empty = self.conn.execute("SELECT 1 FROM tickets LIMIT 1").fetchone() is None
+            if empty:
+                for column in INDEXED_COLUMNS:
+                    self.conn.execute(f"DROP INDEX IF EXISTS idx_tickets_{column.lower()}")
+            # One transaction: a failed import leaves nothing behind and can simply be rerun
+            with open(csv_path, newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                header = next(reader, [])
+                positions = [header.index(column) if column in header else None for column in TICKET_COLUMNS]
+                while True:
+                    rows = [
+                        [row[p] if p is not None and p < len(row) else "" for p in positions]
+                        for row in itertools.islice(reader, IMPORT_CHUNK_ROWS)
+                    ]
+                    if not rows:
+                        break
+                    self.conn.executemany(self.insert_sql, rows)
+                    imported += len(rows)
+            if empty:
+                self._create_indexes()
+            keys = self._backfill_keys(last_rowid)
+            self.conn.execute("INSERT INTO ticket_imports (source, rows) VALUES (?, ?)", (source, imported))
+            self.conn.commit()
+            self.key_index.remember(keys)
+        return imported
+
+
+class TicketBatch:
+    """
+    Collects the tickets of one run and saves them with a single store write.
+    `add` returns the ticket like the store's own `add`, so callers keep their
+    per-ticket return values, and None for a key already used by a saved
+    ticket or earlier in the batch. `flush` returns the tickets actually saved,
+    which leaves out any whose key another session used in the meantime.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.tickets = []
+        self.keys = []
+        self.pending_keys = set()
+
+    def add(self, ticket, key=None):
+        if key is not None:
+            if key in self.pending_keys or self.store.has_key(key):
+                return None
+            self.pending_keys.add(key)
+        self.tickets.append(ticket)
+        self.keys.append(key)
+        return ticket
+
+    def flush(self):
+        saved = self.store.add_many(self.tickets, self.keys)
+        self.tickets, self.keys, self.pending_keys = [], [], set()
+        return saved
+
+
+def open_ticket_store(kind=TICKET_STORE):
+    """
+    The configured ticket store. The SQLite store imports an existing tickets.csv the first time it is opened.
+    """
+    if kind == "csv":
+        return CSVTicketStore()
+    store = SQLiteTicketStore()
+    store.import_csv(TICKETS_FILE)
+    return store
+
+
+# ---------- CLI ----------
+def main():
+    parser = argparse.ArgumentParser(description="Manage the SQLite ticket store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    importer = sub.add_parser("import", help="Import a tickets.csv log (once per file)")
+    importer.add_argument("--csv", default=TICKETS_FILE)
+    importer.add_argument("--db", default=TICKETS_DB_FILE)
+    latest = sub.add_parser("latest", help="Print the most recent tickets")
+    latest.add_argument("-n", type=int, default=20)
+    latest.add_argument("--db", default=TICKETS_DB_FILE)
+
+    args = parser.parse_args()
+    store = SQLiteTicketStore(args.db)
+    if args.command == "import":
+        print(f"Imported {store.import_csv(args.csv)} ticket(s) from {args.csv} into {args.db}")
+    else:
+        print(store.latest(args.n).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()